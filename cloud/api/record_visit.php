@@ -20,29 +20,39 @@ if (!isset($headers['Authorization']) || $headers['Authorization'] !== "Bearer $
     exit();
 }
 
-// Handle POST requests to record a visit
+// Handle POST requests to record one visit, or a batch of visits as {"visits": [...]}
 if ($_SERVER['REQUEST_METHOD'] === 'POST') {
     $input = json_decode(file_get_contents("php://input"), true);
+    $visits = isset($input["visits"]) && is_array($input["visits"]) ? $input["visits"] : [$input];
 
     // Validate input data
-    if (!isset($input["dog"]) || !isset($input["start_time"]) || !isset($input["end_time"])) {
-        http_response_code(400);
-        echo json_encode(["error" => "Invalid input data"]);
-        exit();
+    foreach ($visits as $visit) {
+        if (!isset($visit["dog"]) || !isset($visit["start_time"]) || !isset($visit["end_time"])) {
+            http_response_code(400);
+            echo json_encode(["error" => "Invalid input data"]);
+            exit();
+        }
     }
 
-    // Insert visit into the database
+    // Insert the visits into the database, all or nothing
     try {
         $pdo = get_db_connection();
+        $pdo->beginTransaction();
         $stmt = $pdo->prepare("INSERT INTO visits (dog, start_time, end_time) VALUES (:dog, :start_time, :end_time)");
-        $stmt->execute([
-            ":dog" => $input["dog"],
-            ":start_time" => $input["start_time"],
-            ":end_time" => $input["end_time"]
-        ]);
+        foreach ($visits as $visit) {
+            $stmt->execute([
+                ":dog" => $visit["dog"],
+                ":start_time" => $visit["start_time"],
+                ":end_time" => $visit["end_time"]
+            ]);
+        }
+        $pdo->commit();
 
-        echo json_encode(["status" => "success"]);
+        echo json_encode(["status" => "success", "recorded" => count($visits)]);
     } catch (PDOException $e) {
+        if (isset($pdo) && $pdo->inTransaction()) {
+            $pdo->rollBack();
+        }
         http_response_code(500);
         echo json_encode(["error" => $e->getMessage()]);
     }
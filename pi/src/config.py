@@ -1,37 +1,99 @@
 # General settings
 LOG_FILE = "logs/app.log"  # Path to the log file
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotate the log file at this size...
+LOG_BACKUP_COUNT = 3  # ...keeping this many old files (app.log.1, app.log.2, ...)
+LOG_RATE_LIMIT_WINDOW = 10  # Seconds per rate limit window for each logging call site...
+LOG_RATE_LIMIT_BURST = 5  # ...and the max messages from that call site per window (warnings and errors are never limited)
+LOG_TAIL_LINES = 1000  # Recent log lines kept in memory for /stream-reversed-logs
+LOG_TAIL_POLL_SECONDS = 0.5  # How often the log tailer checks the file for new lines
 
 # API settings
 API_URL = "https://ninas.davidmayman.com/api/record_visit.php"
 API_KEY_FILE = "api_key.txt"  # Path to the file containing the API key
+API_TIMEOUT = (5, 15)  # Connect and read timeouts in seconds for API requests
+API_BATCH_SIZE = 20  # Max visits sent in one request when several are waiting
+API_RETRY_MIN = 5  # Seconds before the first retry of a failed upload; doubles each attempt...
+API_RETRY_MAX = 600  # ...up to this many seconds
 
 # Model configuration
-MODEL_PATH = "tm_dog_model/model4.tflite"  # Path to TensorFlow Lite model
+MODEL_DIR = "tm_dog_model"  # Folder of TensorFlow Lite models that can be activated by name
+MODEL_PATH = "tm_dog_model/model4.tflite"  # Path to the TensorFlow Lite model active at startup
+MODELS_LOADED_MAX = 2  # Models kept loaded with their interpreter pools (the active one and the most recent others)
 CLASS_LABELS = ["Mila", "Nova", "None"]  # Model class labels
 CONFIDENCE_THRESHOLD = 95  # Confidence threshold for valid detection
-INPUT_SIZE = (224, 224)  # Image size expected by the model
+INTERPRETER_POOL_SIZE = 2  # Interpreters shared by the detection loop, Flask routes and batch tools (at least 1)
+INTERPRETER_THREADS = 2  # CPU threads used by each interpreter
+INTERPRETER_USE_XNNPACK = True  # Use TFLite's built-in XNNPACK delegate
+INTERPRETER_DELEGATES = []  # Paths of extra delegate libraries to load (e.g. an Edge TPU delegate)
+
+# Camera settings
+CAMERA_INDEX = 0  # Index of the camera passed to cv2.VideoCapture
+CAMERA_FPS = 5  # Capture rate (also requested from the camera); every frame gets at least the cheap idle check
+IDLE_FPS = 1  # Rate unchanged frames are passed on to motion scoring while the bowl is quiet
+IDLE_CHANGE_PIXEL_THRESHOLD = 8  # Brightness change of a cell of the 32x24 bowl thumbnail counted as a change while idle...
+IDLE_CHANGE_FRACTION = 0.01  # ...and the fraction of cells that must change for a frame to be passed on right away
+SIMULATED_FPS = 5  # Max rate simulated frames are delivered at, like a real camera (0 = no limit)
+SIMULATED_PREFETCH = 8  # Simulated frames decoded ahead of the one being read
+SIMULATED_CACHE_MB = 256  # Memory for decoded simulated frames
+FRAME_BUFFER_SIZE = 4  # Number of recent frames kept in the capture ring buffer
+STALE_FRAME_SECONDS = 0.5  # Frames older than this when consumed are counted as stale
+
+# Pipeline settings
+PIPELINE_QUEUE_SIZE = 2  # Max items waiting between pipeline stages; the oldest is dropped when full
 
 # Motion detection settings
-MOTION_DELAY_MS = 1  # Delay between frames in milliseconds
 MOTION_THRESHOLD = 0.01  # Fraction of frame size required for motion detection
+MOTION_PIXEL_THRESHOLD = 25  # Per-pixel brightness change counted as motion
+MOTION_FRAME_WIDTH = 160  # Width frames are downscaled to before motion scoring
+MOTION_BACKGROUND_ALPHA = 0.1  # Weight of each new frame in the running-average background
 SWITCH_DETECTION_TIME = 1  # Time in seconds for rapid switching detection
 
+# Bowl region of interest (only motion here wakes the classifier, and inference crops around it)
+BOWL_ROI = None  # Rectangle (x, y, w, h) or polygon [(x, y), ...] in frame pixels; None uses the whole frame
+ROI_JSON_PATH = "report/roi.json"  # ROI saved from the /roi route, takes precedence over BOWL_ROI
+
 # Evaluation and visit settings
 VERIFY_TIMES = 2 # Number of times to verify dog detection
+VERIFY_MODE = "batch"  # "batch" verifies buffered frames in one invoke, "sequential" invokes once per new frame
 VISIT_TIMEOUT = 40  # Timeout in seconds for ending a visit
 
+# Inference cache settings (reuses results for near-identical frames while a dog stands at the bowl)
+INFERENCE_CACHE_SIZE = 32  # Max cached results; 0 disables the cache
+INFERENCE_CACHE_MAX_DISTANCE = 8  # Max Hamming distance (of 64 bits) between frame hashes to count as a match (12+ changed visit times on test-set-2)
+INFERENCE_CACHE_TTL = 5  # Seconds before a cached result must be re-checked by the model
+
 # Vibration control settings
 ENABLE_VIBRATION = False  # Master override for enabling/disabling vibration
 VIBRATE_GPIO_PIN = 17  # GPIO pin used for controlling the vibration
-DETECTION_TIMEOUT = 2  # Timeout in seconds for deactivating vibration
+DETECTION_TIMEOUT = 2  # Timeout in seconds for deactivating vibration and dropping back to IDLE_FPS
 
 # Buffer settings
 SAFETY_BUFFER = 120  # Buffer time between Mila's detection and Nova's
 
 # Paths for logs, reports, and test data
 REPORT_DATA_DIR = "static/report-data"  # Directory for storing report images
-TESTS_JSON_PATH = "report/tests.json"  # Path to test case JSON file
-BUZZERS_JSON_PATH = "report/buzzers.json"  # Path to buzz events JSON file
+STREAM_JPEG_QUALITY = 80  # Default JPEG quality for /video_feed and /snapshot.jpg
+JPEG_CACHE_SIZE = 8  # Encoded frame variants kept for streaming clients
+STREAM_MAX_FPS = 10  # Default max frame rate per /video_feed client (?fps= to change)
+STREAM_KEEPALIVE_SECONDS = 5  # Re-send the last frame this often when no new ones arrive, to detect closed clients
+IMAGE_WRITER_WORKERS = 1  # Threads writing report images in the background
+IMAGE_WRITER_QUEUE_SIZE = 16  # Max images waiting to be written
+IMAGE_WRITER_OVERFLOW = "drop_newest"  # When the queue is full: "drop_newest", "drop_oldest" or "block"
+IMAGE_WRITER_JPEG_QUALITY = 90  # JPEG quality for report images
+RETENTION_BUDGET_MB = 4096  # Max disk space for REPORT_DATA_DIR
+RETENTION_TARGET = 0.9  # Once over budget, delete down to this fraction of it
+RETENTION_INTERVAL = 600  # Seconds between retention checks (sooner when a write goes over budget)
+RETENTION_POLICIES = {  # Per-category limits, in the order categories are evicted when over budget
+    "detection": {"max_age_days": 30},  # <Dog>-<timestamp>.jpg from confident detections
+    "buzz_frame": {"max_age_days": None},  # Only deleted once no buzz event refers to them
+    "test_case": {"max_age_days": None}  # Only deleted once no test case refers to them
+}
+STORE_PATH = "report/ninas.db"  # SQLite store for visits, test cases and buzz events
+TEST_CASES_PAGE_SIZE = 50  # Test cases per page in photo_reviewer.py
+
+# Profiling settings
+PROFILE_MAX_SECONDS = 60  # Longest session /profile will run
+PROFILE_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples in sampling mode
 
 # Test case thresholds
 LOW_CONFIDENCE_THRESHOLD = 95  # Low confidence threshold
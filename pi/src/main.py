@@ -1,10 +1,16 @@
+import os
 import time
-import datetime
-import cv2
-from config import CONFIDENCE_THRESHOLD, DETECTION_TIMEOUT, SAFETY_BUFFER, VISIT_TIMEOUT, VIBRATE_GPIO_PIN, REPORT_DATA_DIR
+from config import CONFIDENCE_THRESHOLD, DETECTION_TIMEOUT, SAFETY_BUFFER, VISIT_TIMEOUT, VIBRATE_GPIO_PIN, REPORT_DATA_DIR, INTERPRETER_POOL_SIZE, PIPELINE_QUEUE_SIZE
 from modules.state import app_state as state  # Importing the shared app state object
 from modules.logger import logger  # Importing the shared logger
 from modules.image_processing import evaluate_frames, detect_motion
+from modules.camera import FrameBuffer, CameraGrabber
+from modules.pipeline import Pipeline, Stage, StageQueue
+from modules.scheduler import FrameScheduler
+from modules.image_writer import image_writer
+from modules.retention import retention
+from modules.metrics import metrics
+from modules.clock import clock
 import modules.visits as visits
 import modules.api as api
 import modules.testing as testing
@@ -14,92 +20,156 @@ from modules.routes import app
 
 def main():
     logger.info("Starting niñas...")
-    state.cap = cv2.VideoCapture(0)  # Open the default camera
-    state.cap.set(cv2.CAP_PROP_FPS, 5)  # Limit FPS for performance
-    _, state.prev_frame = state.cap.read()  # Read the first frame
-
-    last_detected_dog = None
-    last_detected_time = datetime.datetime.now()
-    last_motion_time = time.time()
-
-    while True:
-        # Capture the next frame
-        if not state.use_dummy_images:
-            _, state.curr_frame = state.cap.read()
-        else:
-            try:
-                state.curr_frame = testing.get_simulated_image()
-            except ValueError as e:
-                logger.error(f"Simulation error: {e}")
-                break
-
-        current_time = datetime.datetime.now()
-
-        # Evaluate and flip Mila's safety buffer status if needed
-        new_safety_buffer_status = state.last_mila_end_time is not None and (current_time - state.last_mila_end_time).total_seconds() < SAFETY_BUFFER
-        if new_safety_buffer_status != state.safety_buffer_active:
-            state.safety_buffer_active = new_safety_buffer_status
-            status = "ON" if state.safety_buffer_active else "OFF"
-            logger.info(f"Mila's safety buffer is now {status}.")
-
-        # Check for motion before running inference
-        if detect_motion(state.prev_frame, state.curr_frame):
-            logger.debug("Motion detected. Evaluating frame...")
-            result = evaluate_frames()
-            dog = result["class"]
-            confidence_scores = result["confidence_scores"]
-            confidence = confidence_scores[dog]
-
-            # Set up test cases
-            triggered_tests = []
-            triggered_tests = testing.test2_low_confidence(confidence)
-
-            # Continue processing if confidence is above threshold for a dog
-            if confidence >= CONFIDENCE_THRESHOLD and dog != "None":
-                
-                # TEMP Record an image of the detected dog
-                try:
-                    filename = f"{repo_root}/{REPORT_DATA_DIR}/{dog}-{current_time.strftime('%Y%m%d%H%M%S')}.jpg"
-                    cv2.imwrite(filename, state.curr_frame)
-                except Exception as e:
-                    logger.error(f"Failed to save image: {e}")
-
-                detection_result = visits.register_detection(dog)
-                logger.info(f"{detection_result}: {dog} with confidence {confidence:.2f}% {confidence_scores}")
-
-                # Tests
-                triggered_tests += testing.test1_rapid_switching(dog, current_time, last_detected_time, last_detected_dog)
-                triggered_tests += testing.test3_mixed_confidence(dog, confidence_scores)
-                if detection_result == "Nova suppressed":
-                    triggered_tests.append("Nova suppressed due to Mila's buffer.")
-
-                # Buzz event handling
-                if detection_result == "Nova registered":
-                    testing.add_frame_to_buzz_event(state.curr_frame, confidence_scores)
-            
-            elif confidence >= CONFIDENCE_THRESHOLD and dog == "None":
-                vibration.control_vibration("off")
-
-            # Save frame if any test case is triggered
-            if triggered_tests:
-                timestamp = current_time.strftime('%Y%m%d%H%M%S')
-                testing.save_test_case(state.curr_frame, triggered_tests, confidence_scores, timestamp, dog)
-
-            # Update the last motion time
-            last_motion_time = time.time()
-
-        # Finalize visit if no motion for DETECTION_TIMEOUT seconds
-        if time.time() - last_motion_time > DETECTION_TIMEOUT:
-            vibration.control_vibration("off")
-
-        # Finalize visit if VISIT_TIMEOUT seconds have passed since last registered
-        if state.current_visit["dog"] is not None and time.time() - state.current_visit["end_time"].timestamp() > VISIT_TIMEOUT:
-            visits.finalize_visit()
-
-        state.prev_frame = state.curr_frame  # Update the previous frame
-
-
-
+    retention.load_index()  # Before tracking new images, so the first scan can't miss or double-count any
+    image_writer.on_written.append(retention.track)  # Keep the report folder's size index current
+    retention.start()
+    api.outbox.start()  # Uploads visits in the background
+    state.frame_buffer = FrameBuffer()
+    state.scheduler = FrameScheduler()  # Idle frame rate until there is motion
+    state.camera = CameraGrabber(state.frame_buffer, state.scheduler)  # Capture runs on its own thread
+    state.camera.start()
+
+    state.pipeline = build_pipeline()
+    state.pipeline.start()
+
+    # The stages do the work; stop everything if any of them dies (e.g. the camera thread)
+    while state.pipeline.is_alive() and state.camera.is_alive():
+        time.sleep(1)
+    logger.error("Detection pipeline stopped.")
+    state.pipeline.stop()
+
+def build_pipeline():
+    """
+    Connects capture -> motion -> inference -> decision with bounded queues that keep the newest frames.
+    Inference runs one worker per pooled interpreter, so it overlaps with capture and motion scoring,
+    and the decision stage never waits on the camera or the model.
+    """
+    motion_queue = StageQueue("motion", PIPELINE_QUEUE_SIZE)
+    inference_queue = StageQueue("inference", PIPELINE_QUEUE_SIZE)
+    decision_queue = StageQueue("decision", PIPELINE_QUEUE_SIZE)
+
+    last_seq = 0
+    def capture():
+        # Hand the newest captured frame to motion scoring
+        nonlocal last_seq
+        frame = state.frame_buffer.wait_for_frame(last_seq, timeout=1.0)
+        if frame is None:
+            if not state.camera.is_alive():
+                raise StopIteration
+            return None
+        last_seq = frame.seq
+        return frame
+
+    stages = [
+        Stage("capture", capture, output_queue=motion_queue),
+        Stage("motion", score_motion, motion_queue, inference_queue),
+        Stage("inference", evaluate_frames, inference_queue, decision_queue, workers=INTERPRETER_POOL_SIZE),
+        Stage("decision", decide, decision_queue, idle=check_timeouts)
+    ]
+    return Pipeline(stages, [motion_queue, inference_queue, decision_queue])
+
+def score_motion(frame):
+    """
+    Passes the frame on to inference only if there is motion in the bowl area.
+    """
+    with metrics.timer("motion"):
+        motion = detect_motion(frame.image)
+    if not motion.detected:
+        return None
+    metrics.increment("motion_frames")
+    logger.debug(f"Motion detected (score {motion.score:.3f}, box {motion.bbox}). Evaluating frame...")
+    state.scheduler.notify_motion()  # Capture at the burst rate while there is motion
+    now = clock.time()
+    if now - state.last_motion_time > DETECTION_TIMEOUT:
+        state.motion_onset = frame.timestamp  # Something just entered the bowl area
+    state.last_motion_time = now  # Update the last motion time
+    return frame
+
+def decide(result):
+    """
+    Acts on an inference result: registers visits, drives vibration and records test cases.
+    """
+    frame = result["frame"]
+    if frame.seq < state.last_decided_seq:
+        return  # A newer frame has already been decided by another inference worker
+    state.last_decided_seq = frame.seq
+    state.curr_frame = frame.image
+
+    current_time = clock.now()
+    check_timeouts()
+
+    dog = result["class"]
+    confidence_scores = result["confidence_scores"]
+    confidence = confidence_scores[dog]
+    if dog != "Nova":
+        state.last_not_nova_capture = frame.timestamp  # Nova can only have arrived after this frame
+
+    # Set up test cases
+    triggered_tests = []
+    triggered_tests = testing.test2_low_confidence(confidence)
+
+    # Continue processing if confidence is above threshold for a dog
+    if confidence >= CONFIDENCE_THRESHOLD and dog != "None":
+
+        # TEMP Record an image of the detected dog
+        filename = os.path.join(repo_root, REPORT_DATA_DIR, f"{dog}-{current_time.strftime('%Y%m%d%H%M%S')}.jpg")
+        image_writer.write(frame.image, filename)
+
+        # For the motion-to-buzz latency of a buzz event this detection starts
+        onsets = [t for t in (state.motion_onset, state.last_not_nova_capture) if t is not None]
+        state.detection_timings = {
+            "motion_onset": state.motion_onset,
+            "onset": max(onsets) if onsets else None,  # When Nova could first have been in frame
+            "capture": frame.timestamp,
+            "inference_start": result.get("inference_start"),
+            "inference_end": result.get("inference_end"),
+            "decision": clock.time()
+        }
+
+        with metrics.timer("register_visit"):
+            detection_result = visits.register_detection(dog)
+        logger.info(f"{detection_result}: {dog} with confidence {confidence:.2f}% {confidence_scores}")
+
+        # Tests
+        triggered_tests += testing.test1_rapid_switching(dog, current_time, state.last_detected_time, state.last_detected_dog)
+        triggered_tests += testing.test3_mixed_confidence(dog, confidence_scores)
+        if detection_result == "Nova suppressed":
+            triggered_tests.append("Nova suppressed due to Mila's buffer.")
+
+        # Buzz event handling
+        if detection_result == "Nova registered":
+            testing.add_frame_to_buzz_event(frame.image, confidence_scores)
+
+        state.last_detected_dog, state.last_detected_time = dog, current_time
+
+    elif confidence >= CONFIDENCE_THRESHOLD and dog == "None":
+        vibration.control_vibration("off")
+
+    # Save frame if any test case is triggered
+    if triggered_tests:
+        timestamp = current_time.strftime('%Y%m%d%H%M%S')
+        testing.save_test_case(frame.image, triggered_tests, confidence_scores, timestamp, dog)
+
+def check_timeouts():
+    """
+    Flips Mila's safety buffer, turns off vibration and finalizes visits once their timeouts have passed.
+    """
+    current_time = clock.now()
+
+    # Evaluate and flip Mila's safety buffer status if needed
+    new_safety_buffer_status = state.last_mila_end_time is not None and (current_time - state.last_mila_end_time).total_seconds() < SAFETY_BUFFER
+    if new_safety_buffer_status != state.safety_buffer_active:
+        state.safety_buffer_active = new_safety_buffer_status
+        status = "ON" if state.safety_buffer_active else "OFF"
+        logger.info(f"Mila's safety buffer is now {status}.")
+
+    # Finalize visit if no motion for DETECTION_TIMEOUT seconds
+    if clock.time() - state.last_motion_time > DETECTION_TIMEOUT:
+        vibration.control_vibration("off")
+
+    # Finalize visit if VISIT_TIMEOUT seconds have passed since last registered
+    if state.current_visit["dog"] is not None and clock.time() - state.current_visit["end_time"].timestamp() > VISIT_TIMEOUT:
+        visits.finalize_visit()
 
 # Entry point for the script
 if __name__ == "__main__":
@@ -109,6 +179,13 @@ if __name__ == "__main__":
         threading.Thread(target=lambda: app.run(host="0.0.0.0", port=5000, threaded=True)).start()
         main()
     except KeyboardInterrupt:
+        if state.pipeline:
+            state.pipeline.stop()
+        if state.camera:
+            state.camera.stop()
+        image_writer.close()  # Finish writing queued report images
+        retention.stop()
+        api.outbox.stop()
         if state.gpio:
             state.gpio.output(VIBRATE_GPIO_PIN, state.gpio.LOW)
             state.gpio.cleanup()
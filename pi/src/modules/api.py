@@ -1,8 +1,12 @@
 import requests
-import json
-from config import API_URL, API_KEY_FILE
-from modules.state import app_state
+import random
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from config import API_URL, API_KEY_FILE, API_TIMEOUT, API_BATCH_SIZE, API_RETRY_MIN, API_RETRY_MAX
+from modules.store import store
 from modules.logger import logger
+from modules.metrics import metrics
 import os
 
 # Read the API key from a file
@@ -11,26 +15,136 @@ def load_api_key(file_path=API_KEY_FILE):
         raise FileNotFoundError(f"API key file not found: {file_path}")
     with open(file_path, "r") as file:
         return file.read().strip()
-    
+
 API_KEY = load_api_key()
-    
-# Send visit data to the PHP API
+
+# Client errors worth retrying: timeouts, rate limits, and auth errors (a bad or rotated key can be fixed
+# without losing visits). Other 4xx responses mean the visit itself was rejected.
+RETRY_STATUSES = (401, 403, 408, 429)
+
+# Queue visit data for the PHP API
 def send_visit_to_api(dog, start_time, end_time):
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json",
-        "User-Agent": "ninas-script/1.0 (+https://github.com/dmayman/ninas)"
-    }
+    """
+    Adds the visit to the outbox and returns right away; the outbox worker uploads it.
+    """
     payload = {
         "dog": dog,
         "start_time": start_time.isoformat(),
         "end_time": end_time.isoformat()
     }
-    try:
-        response = requests.post(API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        logger.info(f"API: Visit successfully sent for {dog}: {response.json()}")
-    except requests.RequestException as e:
-        logger.error(f"API: Failed to send visit data: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            logger.info(f"Response content: {e.response.text}")
\ No newline at end of file
+    store.add_to_outbox(payload)
+    outbox.wake.set()
+    logger.info(f"API: Visit queued for {dog}.")
+
+class Outbox(threading.Thread):
+    """
+    Uploads queued visits from the store's outbox on its own thread, so a slow or unreachable
+    server never holds up detection and visits survive restarts until the server accepts them.
+    Several pending visits are sent together as {"visits": [...]}. Failed uploads are retried
+    with exponential backoff (API_RETRY_MIN doubling up to API_RETRY_MAX seconds), including auth
+    errors; visits the server rejects as invalid (other 4xx) are marked failed and kept in the store.
+    """
+    def __init__(self, url=API_URL, api_key=None, batch_size=API_BATCH_SIZE, timeout=API_TIMEOUT):
+        super().__init__(name="outbox", daemon=True)
+        self.url = url
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()  # Keeps the connection open between uploads
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key or API_KEY}",
+            "Content-Type": "application/json",
+            "User-Agent": "ninas-script/1.0 (+https://github.com/dmayman/ninas)"
+        })
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.sent = 0
+        self.requests = 0
+        self.errors = 0
+
+    def run(self):
+        logger.info(f"API outbox started ({store.outbox_stats()['pending']} visits pending).")
+        while not self.stopped.is_set():
+            try:
+                if self.send_due():
+                    continue  # More may be waiting
+
+                # Sleep until the next retry is due or a new visit is queued
+                next_attempt = store.next_outbox_attempt()
+                delay = API_RETRY_MAX if next_attempt is None else max(0.0, next_attempt - time.time())
+            except Exception as e:
+                logger.exception(f"API: Outbox error: {e}")
+                delay = API_RETRY_MIN
+            self.wake.wait(delay)
+            self.wake.clear()
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+    def send_due(self):
+        """
+        Sends one batch of due visits. Returns True if any of them were accepted.
+        """
+        entries = store.due_outbox(self.batch_size)
+        if not entries:
+            return False
+        return self.send(entries)
+
+    def send(self, entries):
+        """
+        Posts (id, payload, attempts) outbox entries in one request and updates the outbox with the outcome.
+        A batch the server rejects is split and each visit sent alone, so one bad visit (or a server that
+        doesn't take {"visits": [...]}) doesn't fail the others. Returns True if any visits were accepted.
+        """
+        ids = [entry_id for entry_id, _, _ in entries]
+        payloads = [payload for _, payload, _ in entries]
+        body = payloads[0] if len(payloads) == 1 else {"visits": payloads}
+        attempts = max(attempts for _, _, attempts in entries)
+
+        self.requests += 1
+        try:
+            with metrics.timer("api_post"):
+                response = self.session.post(self.url, json=body, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.errors += 1
+            response = getattr(e, "response", None)
+            if response is not None and 400 <= response.status_code < 500 and response.status_code not in RETRY_STATUSES:
+                if len(entries) > 1:
+                    logger.warning(f"API: Server rejected a batch of {len(ids)} visits ({response.status_code}), sending them one at a time.")
+                    accepted = [self.send([entry]) for entry in entries]
+                    if all(accepted):
+                        # Every visit was fine on its own, so the server doesn't take batches
+                        logger.warning("API: Server doesn't accept batched visits, sending one visit per request from now on.")
+                        self.batch_size = 1
+                    return any(accepted)
+                store.fail_outbox(ids, f"{response.status_code}: {response.text[:200]}")
+                logger.error(f"API: Server rejected the visit, not retrying: {response.status_code} {response.text[:200]}")
+                return False
+
+            if response is not None and response.status_code in (401, 403):
+                self.reload_api_key()  # The key may have been fixed since startup
+            delay = min(API_RETRY_MAX, API_RETRY_MIN * 2 ** attempts) * random.uniform(0.8, 1.2)  # Jitter
+            store.retry_outbox_later(ids, time.time() + delay, str(e)[:200])
+            logger.error(f"API: Failed to send {len(ids)} visits (attempt {attempts + 1}), retrying in {delay:.0f}s: {e}")
+            return False
+
+        store.remove_from_outbox(ids)
+        self.sent += len(ids)
+        logger.info(f"API: {len(ids)} visits successfully sent: {response.text[:200]}")
+        return True
+
+    def reload_api_key(self):
+        try:
+            self.session.headers["Authorization"] = f"Bearer {load_api_key()}"
+        except OSError as e:
+            logger.error(f"API: Could not reload the API key: {e}")
+
+    def stats(self):
+        stats = store.outbox_stats()
+        stats.update({"sent": self.sent, "requests": self.requests, "errors": self.errors})
+        return stats
+
+outbox = Outbox()  # Shared instance; started by main.py
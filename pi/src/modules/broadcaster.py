@@ -0,0 +1,107 @@
+import threading
+import time
+from config import STREAM_MAX_FPS, STREAM_KEEPALIVE_SECONDS, STREAM_JPEG_QUALITY
+from modules.jpeg_cache import jpeg_cache
+from modules.logger import logger
+
+class FrameBroadcaster:
+    """
+    Hands new camera frames to streaming clients. The camera publishes each frame and clients
+    sleep on a condition until one newer than the last they sent arrives, instead of polling.
+    With no subscribers, publishing is a no-op and nothing is encoded.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.frame = None  # Newest published frame
+        self.clients = {}  # id -> StreamClient
+        self.next_client_id = 1
+
+    def publish(self, frame):
+        if not self.clients:
+            return  # Nobody watching
+        with self.condition:
+            self.frame = frame
+            self.condition.notify_all()
+
+    def wait(self, after_seq, timeout):
+        """
+        Waits for a frame newer than `after_seq` and returns the newest one, or None on timeout.
+        """
+        with self.condition:
+            if self.condition.wait_for(lambda: self.frame is not None and self.frame.seq > after_seq, timeout):
+                return self.frame
+            return None
+
+    def subscribe(self, max_fps, quality, width):
+        with self.condition:
+            client = StreamClient(self.next_client_id, max_fps, quality, width)
+            self.clients[client.id] = client
+            self.next_client_id += 1
+            logger.info(f"Stream client {client.id} connected at up to {max_fps} fps ({len(self.clients)} watching).")
+            return client
+
+    def unsubscribe(self, client):
+        with self.condition:
+            self.clients.pop(client.id, None)
+            if not self.clients:
+                self.frame = None  # Don't hold on to a frame nobody will see
+        logger.info(f"Stream client {client.id} disconnected after {client.sent} frames ({client.skipped} skipped).")
+
+    def stream(self, max_fps=STREAM_MAX_FPS, quality=STREAM_JPEG_QUALITY, width=None):
+        """
+        Yields MJPEG parts for one client, never faster than `max_fps`.
+        A slow client skips to the newest frame rather than falling behind.
+        The last frame is re-sent every STREAM_KEEPALIVE_SECONDS when the camera is quiet,
+        so disconnected clients are noticed and unsubscribed.
+        """
+        client = self.subscribe(max_fps, quality, width)
+        period = 1.0 / max_fps
+        next_send = 0.0
+        last_jpeg = None
+        try:
+            while True:
+                # Respect the client's frame rate before looking for the next frame
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+                frame = self.wait(client.last_seq, STREAM_KEEPALIVE_SECONDS)
+                if frame is None:
+                    if last_jpeg is None:
+                        continue
+                    jpeg = last_jpeg  # Keepalive
+                else:
+                    if client.last_seq:
+                        client.skipped += frame.seq - client.last_seq - 1
+                    client.last_seq = frame.seq
+                    jpeg = jpeg_cache.get(frame, quality, width)
+
+                next_send = time.monotonic() + period
+                last_jpeg = jpeg
+                client.sent += 1
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            self.unsubscribe(client)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "subscribers": len(self.clients),
+                "clients": [vars(client).copy() for client in self.clients.values()]
+            }
+
+class StreamClient:
+    """
+    Per-client streaming settings and counters.
+    """
+    def __init__(self, client_id, max_fps, quality, width):
+        self.id = client_id
+        self.max_fps = max_fps
+        self.quality = quality
+        self.width = width
+        self.last_seq = 0  # Sequence number of the last frame sent
+        self.sent = 0  # Frames sent, including keepalives
+        self.skipped = 0  # Frames published while this client was still sending an older one
+
+broadcaster = FrameBroadcaster()  # Shared instance fed by the camera thread
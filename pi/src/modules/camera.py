@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import deque, namedtuple
+import cv2
+from config import CAMERA_INDEX, CAMERA_FPS, FRAME_BUFFER_SIZE, STALE_FRAME_SECONDS
+from modules.state import app_state as state
+from modules.logger import logger
+from modules.metrics import metrics
+from modules.broadcaster import broadcaster
+from modules.simulated_camera import simulated_camera
+
+# A captured frame with its sequence number and capture time (time.time())
+Frame = namedtuple("Frame", ["seq", "timestamp", "image"])
+
+class FrameBuffer:
+    """
+    Small ring buffer of timestamped frames with "latest frame wins" semantics.
+    The capture thread writes into it; consumers always get the newest frame.
+    """
+    def __init__(self, size=FRAME_BUFFER_SIZE):
+        self.frames = deque(maxlen=size)
+        self.condition = threading.Condition()
+        self.seq = 0  # Sequence number of the newest frame
+        self.dropped_frames = 0  # Frames the detection loop never saw
+        self.stale_frames = 0  # Frames older than STALE_FRAME_SECONDS when consumed
+
+    def put(self, image, timestamp=None):
+        """
+        Adds a frame to the buffer, evicting the oldest one if full, and wakes up waiting consumers.
+        Returns the new Frame.
+        """
+        with self.condition:
+            self.seq += 1
+            frame = Frame(self.seq, timestamp or time.time(), image)
+            self.frames.append(frame)
+            self.condition.notify_all()
+            return frame
+
+    def latest(self):
+        """
+        Returns the newest frame without waiting, or None if nothing has been captured yet.
+        """
+        with self.condition:
+            return self.frames[-1] if self.frames else None
+
+    def recent(self, count):
+        """
+        Returns up to `count` of the newest frames, oldest first.
+        """
+        with self.condition:
+            return list(self.frames)[-count:]
+
+    def wait_for_frame(self, after_seq, timeout=None):
+        """
+        Waits until a frame newer than `after_seq` is available and returns the newest one.
+        Frames skipped in between are counted as dropped. Returns None on timeout.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > after_seq, timeout):
+                return None
+            frame = self.frames[-1]
+            if after_seq:
+                self.dropped_frames += frame.seq - after_seq - 1
+            if time.time() - frame.timestamp > STALE_FRAME_SECONDS:
+                self.stale_frames += 1
+            return frame
+
+    def stats(self):
+        return {
+            "seq": self.seq,
+            "dropped_frames": self.dropped_frames,
+            "stale_frames": self.stale_frames
+        }
+
+class CameraGrabber(threading.Thread):
+    """
+    Capture thread that owns the cv2.VideoCapture and keeps the frame buffer filled,
+    so slow detection stages never leave the camera behind.
+    Frames are paced by the scheduler for both the live camera and simulated images,
+    which are fed instead when `state.use_dummy_images` is set. While the bowl is quiet the
+    scheduler only lets idle-rate or changed frames into the buffer.
+    """
+    def __init__(self, frame_buffer, scheduler, camera_index=CAMERA_INDEX):
+        super().__init__(name="camera", daemon=True)
+        self.frame_buffer = frame_buffer
+        self.scheduler = scheduler
+        self.camera_index = camera_index
+        self.cap = None
+        self.read_failures = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        self.cap = cv2.VideoCapture(self.camera_index)  # Open the camera
+        self.cap.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Don't let the driver queue up old frames
+        logger.info(f"Camera thread started on camera {self.camera_index}.")
+
+        try:
+            while not self.stopped.is_set():
+                self.scheduler.wait(self.stopped)  # Sleep until the next frame is due
+                if self.stopped.is_set():
+                    break
+
+                start = time.perf_counter()
+                if state.use_dummy_images:
+                    try:
+                        image = simulated_camera.read()
+                    except ValueError as e:
+                        logger.error(f"Simulation error: {e}")
+                        break
+                else:
+                    ok, image = self.cap.read()
+                    if not ok or image is None:
+                        self.read_failures += 1
+                        logger.warning(f"Failed to read frame from camera ({self.read_failures} failures).")
+                        self.stopped.wait(0.5)
+                        continue
+
+                metrics.observe("capture", time.perf_counter() - start)
+                metrics.increment("frames_captured")
+                if not self.scheduler.should_process(image):
+                    continue  # Quiet and unchanged since the last idle frame
+                frame = self.frame_buffer.put(image)
+                broadcaster.publish(frame)  # For /video_feed clients, if any
+        finally:
+            self.cap.release()
+            logger.info("Camera thread stopped.")
+
+    def stop(self):
+        self.stopped.set()
+        self.scheduler.wake.set()
@@ -0,0 +1,25 @@
+import datetime
+import time
+
+class Clock:
+    """
+    The time used by detection logic (visits, timeouts, buzz events, the inference cache).
+    Normally the wall clock; the replay harness sets it to each recorded frame's timestamp,
+    so timeouts behave the same however fast frames are replayed.
+    """
+    def __init__(self):
+        self.fixed = None  # time.time() value to report instead of the wall clock
+
+    def time(self):
+        return self.fixed if self.fixed is not None else time.time()
+
+    def now(self):
+        return datetime.datetime.fromtimestamp(self.fixed) if self.fixed is not None else datetime.datetime.now()
+
+    def set(self, timestamp):
+        self.fixed = timestamp
+
+    def release(self):
+        self.fixed = None
+
+clock = Clock()  # Shared instance
@@ -1,63 +1,256 @@
+import time
+from collections import namedtuple
 import cv2
 import numpy as np
-import tflite_runtime.interpreter as tflite
 from modules.state import app_state as state
-from config import MODEL_PATH, INPUT_SIZE, CLASS_LABELS, VERIFY_TIMES, MOTION_THRESHOLD
+from config import CLASS_LABELS, VERIFY_TIMES, VERIFY_MODE, INFERENCE_CACHE_SIZE, MOTION_THRESHOLD, MOTION_PIXEL_THRESHOLD, MOTION_FRAME_WIDTH, MOTION_BACKGROUND_ALPHA
 from modules.logger import logger
+from modules.metrics import metrics
+from modules.clock import clock
+from modules.roi import bowl_roi
+from modules.inference_cache import inference_cache, dhash
+from modules.models import ModelRegistry, default_model_name
+from modules.interpreter_pool import PoolClosed
 
-# Initialize TensorFlow Lite model
-interpreter = tflite.Interpreter(model_path=MODEL_PATH)
-interpreter.allocate_tensors()
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
+# Load and warm up the TensorFlow Lite model
+registry = ModelRegistry()
+registry.activate(default_model_name)
 
-# Detect motion between two frames
-def detect_motion(prev_frame, curr_frame):
-    diff = cv2.absdiff(prev_frame, curr_frame)
-    gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 25, 255, cv2.THRESH_BINARY)
-    motion_area = cv2.countNonZero(thresh) / float(thresh.size)
-    return motion_area > MOTION_THRESHOLD
+# Result of motion detection: score is the changed fraction of the ROI, bbox is (x, y, w, h) in frame pixels
+Motion = namedtuple("Motion", ["detected", "score", "bbox"])
+
+class MotionDetector:
+    """
+    Detects motion against a running-average background model of a downscaled grayscale frame,
+    so slow movement that never differs much between two consecutive frames is still caught.
+    Only motion inside the bowl ROI is scored.
+    All intermediate images are preallocated and reused between frames.
+    """
+    def __init__(self, width=MOTION_FRAME_WIDTH, alpha=MOTION_BACKGROUND_ALPHA):
+        self.width = width  # Width of the downscaled frame used for motion scoring
+        self.alpha = alpha  # Weight of each new frame in the background model
+        self.frame_shape = None
+
+    def allocate(self, frame_shape):
+        """
+        (Re)allocates the working buffers and ROI mask for frames of the given shape and resets the background.
+        """
+        height, width = frame_shape[:2]
+        self.scale = width / self.width  # Factor to map downscaled coordinates back to the frame
+        self.size = (self.width, max(1, round(height / self.scale)))  # (width, height) for cv2
+        small_shape = (self.size[1], self.size[0])
+
+        self.small = np.empty(small_shape + (3,), np.uint8)
+        self.gray = np.empty(small_shape, np.uint8)
+        self.background = np.empty(small_shape, np.float32)
+        self.background_gray = np.empty(small_shape, np.uint8)
+        self.diff = np.empty(small_shape, np.uint8)
+        self.mask = np.empty(small_shape, np.uint8)
+        self.roi_mask = bowl_roi.mask(small_shape, self.scale)  # None when the ROI is the whole frame
+        self.roi_area = cv2.countNonZero(self.roi_mask) if self.roi_mask is not None else self.mask.size
+        self.roi_version = bowl_roi.version
+        self.frame_shape = frame_shape
+        self.primed = False
+
+    def detect(self, frame):
+        """
+        Scores the frame against the background model, then folds it into the model.
+        """
+        if frame.shape != self.frame_shape or bowl_roi.version != self.roi_version:
+            self.allocate(frame.shape)
+
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        cv2.GaussianBlur(self.gray, (5, 5), 0, dst=self.gray)  # Suppress sensor noise
+
+        if not self.primed:
+            self.background[:] = self.gray  # First frame seeds the background
+            self.primed = True
+            return Motion(False, 0.0, None)
+
+        cv2.convertScaleAbs(self.background, dst=self.background_gray)
+        cv2.absdiff(self.gray, self.background_gray, dst=self.diff)
+        cv2.threshold(self.diff, MOTION_PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY, dst=self.mask)
+        cv2.accumulateWeighted(self.gray, self.background, self.alpha)
+        if self.roi_mask is not None:
+            cv2.bitwise_and(self.mask, self.roi_mask, dst=self.mask)  # Ignore motion outside the bowl area
+
+        changed = cv2.countNonZero(self.mask)
+        score = changed / float(max(self.roi_area, 1))
+        bbox = None
+        if changed:
+            x, y, w, h = cv2.boundingRect(self.mask)
+            bbox = tuple(round(v * self.scale) for v in (x, y, w, h))
+        return Motion(score > MOTION_THRESHOLD, score, bbox)
+
+motion_detector = MotionDetector()
+
+# Detect motion in the frame against the background model
+def detect_motion(frame):
+    return motion_detector.detect(frame)
 
 def preprocess_image(img, input_size):
     """
-    Preprocesses the input image to match the model's requirements by cropping to a square and resizing.
+    Preprocesses the input image to match the model's requirements by cropping a square around the bowl ROI and resizing.
     """
-    height, width, _ = img.shape
-    crop_size = min(height, width)  # Square crop size (smallest dimension)
-    cropped_img = img[0:crop_size, 0:crop_size]  # Crop to a square
+    top, bottom, left, right = bowl_roi.crop(img.shape)  # Precomputed square crop
+    cropped_img = img[top:bottom, left:right]  # Crop to a square
     resized_img = cv2.resize(cropped_img, input_size).astype(np.uint8)  # Resize and convert to uint8
     return np.expand_dims(resized_img, axis=0)  # Add batch dimension
 
-def evaluate_frames():
+def preprocess_into(img, dst):
     """
-    Evaluates the image using the TensorFlow Lite model and returns the averaged confidence scores.
+    Crops a square around the bowl ROI and resizes it straight into `dst`, a view of the interpreter's input tensor.
     """
-    last_top_class = None
-    confidence_sums = {label: 0.0 for label in CLASS_LABELS}  # Sum of confidence scores for averaging
-    confidence_averages = {label: 0.0 for label in CLASS_LABELS}  # Averaged confidence scores
+    top, bottom, left, right = bowl_roi.crop(img.shape)  # Precomputed square crop
+    cv2.resize(img[top:bottom, left:right], (dst.shape[1], dst.shape[0]), dst=dst)
+
+def classify(images, model=None, runner=None):
+    """
+    Runs a single invoke over `images` and returns a (len(images), len(CLASS_LABELS)) float32 array
+    of confidence scores in 0-100%, with columns in CLASS_LABELS order.
+    Uses the active model and checks an interpreter out of its pool unless `model` and `runner` are given.
+    """
+    if model is None:
+        model = registry.active  # Read once, so a model swap mid-call can't mix models
+    if runner is None:
+        try:
+            with model.pool.interpreter() as runner:
+                return classify(images, model, runner)
+        except PoolClosed:
+            return classify(images)  # The model was unloaded after a swap; use the one active now
+
+    interpreter = runner.interpreter
+    runner.set_batch_size(len(images))
+    start = time.perf_counter()
+    if model.input_dtype == np.uint8:  # cv2.resize can only write uint8 pixels in place
+        input_tensor = interpreter.tensor(runner.input_index)
+        for i, image in enumerate(images):
+            preprocess_into(image, input_tensor()[i])  # Resize directly into the input buffer (view isn't held across invoke)
+    else:
+        batch = np.concatenate([preprocess_image(image, model.input_size) for image in images])
+        interpreter.set_tensor(runner.input_index, quantize_input(batch, model))
+    invoke_start = time.perf_counter()
+    interpreter.invoke()  # Run inference
+    invoke_end = time.perf_counter()
+
+    # Dequantize predictions to 0-100% while reading them through a view of the output buffer
+    scores = model.dequantize(interpreter.tensor(runner.output_index)())
+    scores = np.nan_to_num(scores, copy=False, nan=0.0)  # Replace NaN with 0 if any
+
+    metrics.observe("preprocess", invoke_start - start)
+    metrics.observe("invoke", invoke_end - invoke_start)
+    metrics.observe("postprocess", time.perf_counter() - invoke_end)
+    metrics.increment("inferences")
+    metrics.increment("frames_classified", len(images))
+    return scores
+
+def quantize_input(batch, model):
+    """
+    Converts a uint8 image batch to the model's input type using its quantization parameters.
+    """
+    scale, zero_point = model.input_quantization
+    pixels = batch.astype(np.float32)
+    if scale:
+        pixels = np.round(pixels / 255.0 / scale + zero_point)  # Quantized input of normalized pixels
+    else:
+        pixels /= 255.0  # Float models take pixels in [0, 1]
+    return pixels.astype(model.input_dtype)
+
+def activate_model(name):
+    """
+    Hot-swaps the active model and forgets results cached from the previous one.
+    """
+    model = registry.activate(name)
+    inference_cache.clear()
+    return model
+
+def scores_to_dict(scores):
+    """
+    Converts a row of scores into the {label: confidence} dict used by visits, tests and reports.
+    """
+    return {label: float(scores[i]) for i, label in enumerate(CLASS_LABELS)}
+
+def evaluate_frames(frame):
+    """
+    Evaluates a captured frame using the TensorFlow Lite model and returns the averaged confidence scores,
+    along with the last frame that was evaluated.
+    Near-duplicates of a recently classified frame reuse its result from the inference cache.
+    Uses a single batched invoke when VERIFY_MODE is "batch", falling back to sequential verification
+    if the model can't be resized to a batch.
+    """
+    global verify_mode
+    start = clock.time()
+    frame_hash = None
+    if INFERENCE_CACHE_SIZE:
+        frame_hash = dhash(frame.image)
+        cached = inference_cache.get(frame_hash)
+        if cached is not None:
+            return dict(cached, frame=frame, cached=True, inference_start=start, inference_end=clock.time())
+
+    result = None
+    if verify_mode == "batch":
+        try:
+            result = evaluate_frames_batch(frame)
+        except (RuntimeError, ValueError) as e:
+            logger.error(f"Batched verification failed, falling back to sequential: {e}")
+            verify_mode = "sequential"
+    if result is None:
+        result = evaluate_frames_sequential(frame)
 
-    for idx in range(VERIFY_TIMES):        
-        _, state.curr_frame = state.cap.read() if idx else (None, state.curr_frame)  # Read a new frame if idx > 0
-        img = preprocess_image(state.curr_frame, INPUT_SIZE)  # Preprocess image
-        interpreter.set_tensor(input_details[0]['index'], img)  # Set input tensor
-        interpreter.invoke()  # Run inference
-        predictions = interpreter.get_tensor(output_details[0]['index'])[0]  # Get model output
+    if frame_hash is not None:
+        inference_cache.put(frame_hash, {"class": result["class"], "confidence_scores": result["confidence_scores"]})
+    result.update(inference_start=start, inference_end=clock.time())
+    return result
 
-        # Scale predictions from 0-255 to 0-100%
-        predictions = predictions / 255.0 * 100.0
-        predictions = np.nan_to_num(predictions, nan=0.0)  # Replace NaN with 0 if any
+verify_mode = VERIFY_MODE
 
-        # Incremental sum of confidence scores
-        for i, label in enumerate(CLASS_LABELS):
-            confidence_sums[label] += predictions[i]  # Add to the running sum
+def evaluate_frames_batch(frame):
+    """
+    Verifies the detection over the frame and the frames buffered just before it in one invoke.
+    The running averages and instability check match the sequential loop, vectorized over the batch.
+    """
+    # The frame first, then older buffered frames
+    older = [f.image for f in reversed(state.frame_buffer.recent(VERIFY_TIMES + 1)) if f.seq < frame.seq]
+    images = [frame.image] + older[:VERIFY_TIMES - 1]
+    predictions = classify(images)  # One row per frame
+
+    # Running average after each frame and its top class
+    averages = np.cumsum(predictions, axis=0) / np.arange(1, len(images) + 1)[:, None]
+    top_classes = averages.argmax(axis=1)
+
+    # Stop at the first frame where the top class changes, like the sequential loop
+    changes = np.flatnonzero(top_classes != top_classes[0])
+    last = changes[0] if changes.size else len(images) - 1
+    if changes.size:
+        logger.info(f"Detected class instability: Changed from {CLASS_LABELS[top_classes[0]]} to {CLASS_LABELS[top_classes[last]]}. Ending evaluation.")
+
+    return {
+        "class": CLASS_LABELS[top_classes[0]],  # Final detected class
+        "confidence_scores": scores_to_dict(averages[last]),  # Averaged confidence scores for all classes
+        "frame": frame  # Frame the detection is reported against
+    }
+
+def evaluate_frames_sequential(frame):
+    """
+    Verifies the detection by running inference on VERIFY_TIMES consecutive frames, one invoke each.
+    """
+    last_top_class = None
+    confidence_sums = np.zeros(len(CLASS_LABELS), np.float32)  # Sum of confidence scores for averaging
+    confidence_averages = confidence_sums  # Averaged confidence scores
 
-        # Calculate the running average
-        num_cycles = idx + 1  # Calculate the current number of cycles
-        for label in CLASS_LABELS:
-            confidence_averages[label] = confidence_sums[label] / num_cycles
+    for idx in range(VERIFY_TIMES):
+        if idx:
+            # Take the next frame from the capture buffer instead of reading the camera
+            next_frame = state.frame_buffer.wait_for_frame(frame.seq, timeout=1.0)
+            if next_frame is None:
+                logger.warning("No new frame available for verification. Ending evaluation.")
+                break
+            frame = next_frame
 
-        top_class = max(confidence_averages, key=confidence_averages.get)  # Class with the highest average confidence
+        confidence_sums += classify([frame.image])[0]  # Add to the running sum
+        confidence_averages = confidence_sums / (idx + 1)  # Calculate the running average
+        top_class = CLASS_LABELS[confidence_averages.argmax()]  # Class with the highest average confidence
 
         # Check if the detected class is unstable
         if last_top_class and top_class != last_top_class:
@@ -68,5 +261,6 @@ def evaluate_frames():
 
     return {
         "class": last_top_class,  # Final detected class
-        "confidence_scores": confidence_averages # Averaged confidence scores for all classes
-    }
\ No newline at end of file
+        "confidence_scores": scores_to_dict(confidence_averages), # Averaged confidence scores for all classes
+        "frame": frame  # Last frame that was evaluated
+    }
@@ -0,0 +1,162 @@
+import atexit
+import threading
+import time
+from collections import deque, namedtuple
+import cv2
+from config import IMAGE_WRITER_WORKERS, IMAGE_WRITER_QUEUE_SIZE, IMAGE_WRITER_OVERFLOW, IMAGE_WRITER_JPEG_QUALITY
+from modules.logger import logger
+from modules.metrics import metrics
+
+# An image waiting to be written, with the time it was queued (time.perf_counter())
+WriteJob = namedtuple("WriteJob", ["image", "path", "params", "queued_at"])
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+class ImageWriter:
+    """
+    Background image writer, so the detection pipeline never waits on the SD card.
+    `write()` copies the frame and queues it; worker threads encode and save it.
+    When the queue is full, `overflow` decides what happens:
+    "drop_newest" rejects the new image, "drop_oldest" drops the oldest queued image,
+    and "block" waits for room (only for tools that would rather wait than lose images).
+    """
+    def __init__(self, workers=IMAGE_WRITER_WORKERS, queue_size=IMAGE_WRITER_QUEUE_SIZE, overflow=IMAGE_WRITER_OVERFLOW, jpeg_quality=IMAGE_WRITER_JPEG_QUALITY):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow} (expected one of {', '.join(OVERFLOW_POLICIES)})")
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.default_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.jobs = deque()
+        self.condition = threading.Condition()
+        self.in_flight = 0  # Jobs taken by a worker but not written yet
+        self.closed = False
+        self.on_written = []  # Callbacks called with the path of each image written
+
+        # Metrics
+        self.queued = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_backlog = 0
+        self.total_write_time = 0.0  # Seconds spent encoding and writing
+        self.max_write_time = 0.0
+        self.total_wait_time = 0.0  # Seconds jobs spent in the queue
+
+        self.threads = [
+            threading.Thread(target=self.run, name=f"image-writer-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+        atexit.register(self.close)
+
+    def write(self, image, path, params=None):
+        """
+        Queues a copy of `image` to be saved at `path`. Returns False if the image was dropped.
+        """
+        job = WriteJob(image.copy(), str(path), params or self.default_params, time.perf_counter())
+        with self.condition:
+            if self.closed:
+                logger.warning(f"Image writer is closed, not saving {path}.")
+                return False
+            if len(self.jobs) >= self.queue_size:
+                if self.overflow == "drop_newest":
+                    self.dropped += 1
+                    logger.warning(f"Image writer backlog full, dropping {path}.")
+                    return False
+                elif self.overflow == "drop_oldest":
+                    dropped = self.jobs.popleft()
+                    self.dropped += 1
+                    logger.warning(f"Image writer backlog full, dropping {dropped.path}.")
+                else:
+                    self.condition.wait_for(lambda: len(self.jobs) < self.queue_size or self.closed)
+                    if self.closed:
+                        return False
+            self.jobs.append(job)
+            self.queued += 1
+            self.max_backlog = max(self.max_backlog, len(self.jobs))
+            self.condition.notify_all()
+            return True
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.jobs or self.closed)
+                if not self.jobs:
+                    return  # Closed and drained
+                job = self.jobs.popleft()
+                self.in_flight += 1
+                self.condition.notify_all()  # Room for a blocked writer
+
+            start = time.perf_counter()
+            try:
+                ok = cv2.imwrite(job.path, job.image, job.params)
+                if not ok:
+                    logger.error(f"Failed to save image {job.path}.")
+            except Exception as e:
+                ok = False
+                logger.error(f"Failed to save image {job.path}: {e}")
+            write_time = time.perf_counter() - start
+            metrics.observe("imwrite", write_time)
+
+            if ok:
+                for callback in self.on_written:
+                    try:
+                        callback(job.path)
+                    except Exception as e:
+                        logger.error(f"Error after saving image {job.path}: {e}")
+
+            with self.condition:
+                self.in_flight -= 1
+                if ok:
+                    self.written += 1
+                else:
+                    self.failed += 1
+                self.total_write_time += write_time
+                self.max_write_time = max(self.max_write_time, write_time)
+                self.total_wait_time += start - job.queued_at
+                self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Waits until every queued image has been written. Returns False on timeout.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.jobs and not self.in_flight, timeout)
+
+    def close(self, timeout=10):
+        """
+        Stops accepting images and waits for the backlog to be written.
+        """
+        with self.condition:
+            if self.closed:
+                return
+            backlog = len(self.jobs) + self.in_flight
+            self.closed = True
+            self.condition.notify_all()
+        if backlog:
+            logger.info(f"Flushing {backlog} queued images...")
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in self.threads):
+            logger.warning(f"Image writer did not finish within {timeout}s; {len(self.jobs)} images not saved.")
+
+    def stats(self):
+        with self.condition:
+            finished = self.written + self.failed
+            return {
+                "backlog": len(self.jobs),
+                "in_flight": self.in_flight,
+                "max_backlog": self.max_backlog,
+                "capacity": self.queue_size,
+                "overflow": self.overflow,
+                "queued": self.queued,
+                "written": self.written,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "avg_write_ms": round(self.total_write_time / finished * 1000, 2) if finished else None,
+                "max_write_ms": round(self.max_write_time * 1000, 2),
+                "avg_queue_wait_ms": round(self.total_wait_time / finished * 1000, 2) if finished else None
+            }
+
+image_writer = ImageWriter()  # Shared instance
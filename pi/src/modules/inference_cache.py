@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from config import INFERENCE_CACHE_SIZE, INFERENCE_CACHE_MAX_DISTANCE, INFERENCE_CACHE_TTL
+from modules.clock import clock
+from modules.roi import bowl_roi
+
+def dhash(img):
+    """
+    Returns a 64-bit difference hash of the bowl ROI crop: each bit says whether a pixel of a
+    9x8 grayscale thumbnail is brighter than its left neighbour. Near-identical frames hash to nearby values.
+    """
+    top, bottom, left, right = bowl_roi.crop(img.shape)
+    thumbnail = cv2.resize(img[top:bottom, left:right], (9, 8), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+    bits = gray[:, 1:] > gray[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+class InferenceCache:
+    """
+    Reuses the last classification for near-duplicate frames (e.g. a dog standing still at the bowl).
+    Entries are keyed by dHash and match within a Hamming distance; they expire after a TTL
+    and the least recently used entry is evicted when full.
+    """
+    def __init__(self, size=INFERENCE_CACHE_SIZE, max_distance=INFERENCE_CACHE_MAX_DISTANCE, ttl=INFERENCE_CACHE_TTL):
+        self.size = size
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.entries = OrderedDict()  # hash -> (time stored, result)
+        self.lock = threading.Lock()
+        self.hits = 0  # Invocations saved
+        self.misses = 0  # Frames that had to be classified
+
+    def get(self, frame_hash):
+        """
+        Returns the cached result of the closest unexpired hash within `max_distance`, or None.
+        """
+        now = clock.time()
+        with self.lock:
+            for key in [key for key, (stored, _) in self.entries.items() if now - stored > self.ttl]:
+                del self.entries[key]
+
+            match, distance = None, self.max_distance + 1
+            for key in self.entries:
+                key_distance = bin(key ^ frame_hash).count("1")  # Hamming distance
+                if key_distance < distance:
+                    match, distance = key, key_distance
+
+            if match is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(match)
+            self.hits += 1
+            return self.entries[match][1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def put(self, frame_hash, result):
+        with self.lock:
+            self.entries[frame_hash] = (clock.time(), result)
+            self.entries.move_to_end(frame_hash)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)  # Evict the least recently used entry
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+inference_cache = InferenceCache()  # Shared instance
@@ -0,0 +1,153 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import tflite_runtime.interpreter as tflite
+from config import MODEL_PATH, INTERPRETER_POOL_SIZE, INTERPRETER_THREADS, INTERPRETER_USE_XNNPACK, INTERPRETER_DELEGATES
+
+# Use the shared "ninas" logger without importing modules.logger, so the batch tools
+# in pi/utilities can use the pool without setting up the app's log files
+logger = logging.getLogger("ninas")
+
+def load_delegates(delegate_paths):
+    """
+    Loads external delegate libraries, skipping (and logging) any that fail to load.
+    """
+    delegates = []
+    for path in delegate_paths:
+        try:
+            delegates.append(tflite.load_delegate(path))
+        except (ValueError, OSError) as e:
+            logger.error(f"Failed to load TFLite delegate {path}: {e}")
+    return delegates
+
+class PooledInterpreter:
+    """
+    A TFLite interpreter with its tensor details, owned by one worker at a time.
+    """
+    def __init__(self, model_path, num_threads, use_xnnpack, delegates):
+        resolver = tflite.OpResolverType.AUTO if use_xnnpack else tflite.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        self.interpreter = tflite.Interpreter(
+            model_path=model_path,
+            num_threads=num_threads,
+            experimental_delegates=delegates or None,
+            experimental_op_resolver_type=resolver
+        )
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()
+        self.output_details = self.interpreter.get_output_details()
+        self.input_index = self.input_details[0]['index']
+        self.output_index = self.output_details[0]['index']
+        self.batch_size = 1  # Current batch size of the input tensor, None if a failed resize left it unknown
+
+    def set_batch_size(self, size):
+        """
+        Resizes the input to a batch of `size` frames. Only reallocates when the size changes.
+        If the interpreter can't be resized, it's put back to its previous batch size and the error is re-raised.
+        """
+        if size == self.batch_size:
+            return
+        previous = self.batch_size or 1
+        try:
+            self.resize_input(size)
+        except (RuntimeError, ValueError):
+            self.batch_size = None  # Unknown until the restore succeeds, so the next call resizes again
+            self.resize_input(previous)
+            self.batch_size = previous
+            raise
+        self.batch_size = size
+
+    def resize_input(self, size):
+        input_shape = list(self.input_details[0]['shape'])
+        input_shape[0] = size
+        self.interpreter.resize_tensor_input(self.input_index, input_shape)
+        self.interpreter.allocate_tensors()
+
+    def warm_up(self):
+        """
+        Runs one invoke on a blank input so the first real detection doesn't pay for it.
+        Returns the time it took in seconds.
+        """
+        start = time.perf_counter()
+        self.interpreter.set_tensor(self.input_index, np.zeros(self.input_details[0]['shape'], self.input_details[0]['dtype']))
+        self.interpreter.invoke()
+        return time.perf_counter() - start
+
+class PoolClosed(RuntimeError):
+    """
+    Raised when checking out of a pool that has been closed (e.g. its model was unloaded).
+    """
+
+class InterpreterPool:
+    """
+    A fixed set of warmed-up interpreters for one model. Each worker checks one out,
+    so interpreters are never shared between threads.
+    """
+    def __init__(self, model_path=MODEL_PATH, size=INTERPRETER_POOL_SIZE, num_threads=INTERPRETER_THREADS,
+                 use_xnnpack=INTERPRETER_USE_XNNPACK, delegate_paths=INTERPRETER_DELEGATES):
+        if size < 1:
+            raise ValueError(f"An interpreter pool needs at least 1 interpreter, got {size} (check INTERPRETER_POOL_SIZE).")
+        self.model_path = model_path
+        self.size = size
+        self.available = queue.LifoQueue()  # Reuse the most recently used (cache-warm) interpreter first
+        self.lock = threading.Lock()  # Orders check-ins against close()
+        self.closed = False
+
+        runners = [PooledInterpreter(model_path, num_threads, use_xnnpack, load_delegates(delegate_paths)) for _ in range(size)]
+        warm_up_time = max(runner.warm_up() for runner in runners)
+        for runner in runners:
+            self.available.put(runner)
+        logger.info(f"Interpreter pool ready: {size} x {model_path} with {num_threads} threads (warm-up {warm_up_time * 1000:.1f} ms).")
+
+        # Tensor details are the same for every interpreter in the pool
+        self.input_details = runners[0].input_details
+        self.output_details = runners[0].output_details
+
+    def checkout(self, timeout=None):
+        """
+        Takes an interpreter out of the pool, waiting up to `timeout` seconds for one to be free.
+        Raises PoolClosed if the pool is closed.
+        """
+        try:
+            runner = self.available.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No interpreter available for {self.model_path} within {timeout}s")
+        if runner is None:
+            self.available.put(None)  # Wake the next waiter too
+            raise PoolClosed(f"Interpreter pool for {self.model_path} is closed")
+        return runner
+
+    def checkin(self, runner):
+        """
+        Returns an interpreter to the pool, or lets it go if the pool has been closed.
+        """
+        with self.lock:
+            if not self.closed:
+                self.available.put(runner)
+
+    def close(self):
+        """
+        Releases the pool's interpreters: the free ones now, the checked out ones as they're checked in,
+        so inference in flight finishes normally. Later checkouts raise PoolClosed.
+        """
+        with self.lock:
+            self.closed = True
+            while True:
+                try:
+                    self.available.get_nowait()
+                except queue.Empty:
+                    break
+            self.available.put(None)  # Wakes waiting and later checkouts, which then raise PoolClosed
+
+    @contextmanager
+    def interpreter(self, timeout=None):
+        """
+        Checks out an interpreter for the duration of a `with` block.
+        """
+        runner = self.checkout(timeout)
+        try:
+            yield runner
+        finally:
+            self.checkin(runner)
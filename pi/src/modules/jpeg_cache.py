@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+import cv2
+from config import STREAM_JPEG_QUALITY, JPEG_CACHE_SIZE
+
+class JpegCache:
+    """
+    Encoded JPEGs of recent frames, keyed by (frame sequence number, quality, width).
+    Each frame is encoded at most once per variant, however many clients ask for it,
+    and every MJPEG client and snapshot gets the same bytes.
+    """
+    def __init__(self, size=JPEG_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()  # (seq, quality, width) -> JPEG bytes, oldest first
+        self.encoding = {}  # (seq, quality, width) -> Lock held while that variant is being encoded
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.encodes = 0
+
+    def get(self, frame, quality=STREAM_JPEG_QUALITY, width=None):
+        """
+        Returns `frame` (a camera.Frame) as JPEG bytes, encoding it only if no one has yet.
+        `width` scales the frame down (keeping its aspect ratio) before encoding.
+        """
+        if width and width >= frame.image.shape[1]:
+            width = None  # Never scale up; share the full size variant instead
+        key = (frame.seq, quality, width)
+
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                return self.entries[key]
+            key_lock = self.encoding.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another client may have encoded it while we waited
+            with self.lock:
+                if key in self.entries:
+                    self.hits += 1
+                    return self.entries[key]
+
+            try:
+                jpeg = encode_jpeg(frame.image, quality, width)
+                with self.lock:
+                    self.encodes += 1
+                    self.entries[key] = jpeg
+                    while len(self.entries) > self.size:
+                        self.entries.popitem(last=False)  # Oldest frames first
+            finally:
+                with self.lock:
+                    self.encoding.pop(key, None)  # Even if encoding failed, so the lock doesn't leak
+            return jpeg
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "encodes": self.encodes,
+                "hits": self.hits
+            }
+
+def encode_jpeg(image, quality, width=None):
+    if width:
+        height = round(image.shape[0] * width / image.shape[1])
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+jpeg_cache = JpegCache()  # Shared by the video feed and snapshot routes
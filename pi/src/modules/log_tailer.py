@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import deque
+from config import LOG_FILE, LOG_TAIL_LINES, LOG_TAIL_POLL_SECONDS
+
+class LogTailer(threading.Thread):
+    """
+    Follows the log file on one thread and keeps its most recent lines in memory, so any number of
+    /stream-reversed-logs clients can be served without touching the disk.
+    Every line gets an increasing id, so a reconnecting client can resume after the last id it saw.
+    Ids restart at 1 with the process, so the event ids sent to clients carry a per-process epoch
+    ("<epoch>-<id>"); an id from an earlier run resumes from the start of the ring.
+    Rotation (the file being renamed and recreated) and truncation are detected and followed.
+    """
+    def __init__(self, path=LOG_FILE, max_lines=LOG_TAIL_LINES, poll_interval=LOG_TAIL_POLL_SECONDS):
+        super().__init__(name="log-tailer", daemon=True)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lines = deque(maxlen=max_lines)  # (id, line), oldest first
+        self.last_id = 0
+        self.epoch = f"{int(time.time()):x}"  # Tells this run's event ids from a previous run's
+        self.condition = threading.Condition()
+        self.start_lock = threading.Lock()
+        self.file = None
+        self.partial = ""  # Text after the last newline, waiting for the rest of its line
+
+    def ensure_started(self):
+        with self.start_lock:
+            if not self.is_alive():
+                self.start()
+
+    def run(self):
+        self.open(from_start=False)
+        while True:
+            self.read_new_lines()
+            if self.rotated():
+                self.read_new_lines()  # Whatever was written before the rename
+                self.open(from_start=True)
+            time.sleep(self.poll_interval)
+
+    def open(self, from_start):
+        """
+        Opens the log file. On the first open, loads only its tail into the ring.
+        """
+        if self.file:
+            self.file.close()
+            self.file = None
+        try:
+            self.file = open(self.path, "r", errors="replace")
+        except FileNotFoundError:
+            return
+        self.partial = ""
+        if not from_start:
+            size = self.file.seek(0, os.SEEK_END)
+            self.file.seek(max(0, size - 200 * self.lines.maxlen))  # Roughly enough bytes for a full ring
+            if self.file.tell():
+                self.file.readline()  # Skip the partial first line
+
+    def rotated(self):
+        """
+        Returns True if the log file was replaced or truncated since we opened it.
+        """
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return False  # Mid-rotation; keep reading the old file until the new one appears
+        if self.file is None:
+            return True
+        opened = os.fstat(self.file.fileno())
+        return current.st_ino != opened.st_ino or current.st_size < self.file.tell()
+
+    def read_new_lines(self):
+        if self.file is None:
+            return
+        text = self.file.read()
+        if not text:
+            return
+        *complete, self.partial = (self.partial + text).split("\n")
+        if not complete:
+            return
+        with self.condition:
+            for line in complete:
+                self.last_id += 1
+                self.lines.append((self.last_id, line))
+            self.condition.notify_all()
+
+    def event_id(self, line_id):
+        return f"{self.epoch}-{line_id}"
+
+    def resume_after(self, event_id):
+        """
+        Returns the line id to resume after for a client's Last-Event-ID: its line id if it came from
+        this run, otherwise 0 so the client gets the whole ring.
+        """
+        epoch, _, line_id = (event_id or "").rpartition("-")
+        if epoch != self.epoch or not line_id.isdigit():
+            return 0
+        return int(line_id)
+
+    def wait_for_lines(self, after_id, timeout):
+        """
+        Returns the buffered (id, line) pairs newer than `after_id`, waiting up to `timeout` seconds
+        for some to arrive. Lines that already fell out of the ring are skipped.
+        """
+        with self.condition:
+            if after_id > self.last_id:
+                after_id = 0  # From before a restart; start from the ring
+            self.condition.wait_for(lambda: self.last_id > after_id, timeout)
+            return [(line_id, line) for line_id, line in self.lines if line_id > after_id]
+
+log_tailer = LogTailer()  # Shared instance; started by the first log stream client
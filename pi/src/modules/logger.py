@@ -1,26 +1,99 @@
+import atexit
+import copy
 import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from modules.utils import folder_exists
-from config import REPORT_DATA_DIR
+from config import REPORT_DATA_DIR, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_RATE_LIMIT_WINDOW, LOG_RATE_LIMIT_BURST
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` records per `window` seconds from each logging call site,
+    so a message logged on every frame can't flood the log. The next record let through from
+    that call site says how many were suppressed. Warnings and errors are never suppressed.
+    """
+    def __init__(self, window=LOG_RATE_LIMIT_WINDOW, burst=LOG_RATE_LIMIT_BURST):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.sites = {}  # (file, line) -> [window start, records let through, records suppressed]
+        self.lock = threading.Lock()  # Records are filtered on whichever thread logs them
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            site = self.sites.get((record.pathname, record.lineno))
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site else 0
+                site = self.sites[(record.pathname, record.lineno)] = [now, 0, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+            if site[1] >= self.burst:
+                site[2] += 1
+                return False
+            site[1] += 1
+            return True
+
+def file_and_console_handlers(log_file=LOG_FILE, stream=None):
+    """
+    Returns the handlers that do the actual writing: a size-rotated log file and the console.
+    """
+    # 1. **File Handler**: Logs only `INFO` and above to the file, rotated at LOG_MAX_BYTES
+    file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    file_handler.setLevel(logging.INFO)  # Only logs `INFO`, `WARNING`, `ERROR`, `CRITICAL`
+    file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    file_handler.setFormatter(file_formatter)
+
+    # 2. **Console Handler**: Logs **everything** (including `DEBUG`)
+    console_handler = logging.StreamHandler(stream or sys.stderr)
+    console_handler.setLevel(logging.DEBUG)  # Logs `DEBUG` and above to console
+    console_formatter = logging.Formatter("%(levelname)s - %(message)s")
+    console_handler.setFormatter(console_formatter)
+
+    return [file_handler, console_handler]
+
+class LocalQueueHandler(QueueHandler):
+    """
+    QueueHandler for a listener in the same process. The stock prepare() runs the formatter (timestamp,
+    traceback) on the logging thread so the record can be pickled; here the record is only copied with
+    its message merged with its args (so later changes to them don't show up), and the listener's
+    handlers do all the formatting.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def queue_logging(target_logger, handlers, rate_limit=True):
+    """
+    Routes `target_logger` through a queue to `handlers` on a listener thread, so logging calls
+    only merge the message with its arguments and enqueue the record. Formatting, the SD card and
+    the console are left to the listener.
+    Returns the started QueueListener.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter())  # Drop floods before they are queued
+    target_logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
 
 # Create a logger
 logger = logging.getLogger("ninas")
 logger.setLevel(logging.DEBUG)  # Overall logger level to allow all logs
 
-# 1. **File Handler**: Logs only `INFO` and above to the file
-file_handler = logging.FileHandler("logs/app.log")
-file_handler.setLevel(logging.INFO)  # Only logs `INFO`, `WARNING`, `ERROR`, `CRITICAL`
-file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-file_handler.setFormatter(file_formatter)
-
-# 2. **Console Handler**: Logs **everything** (including `DEBUG`)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)  # Logs `DEBUG` and above to console
-console_formatter = logging.Formatter("%(levelname)s - %(message)s")
-console_handler.setFormatter(console_formatter)
-
-# Add handlers to the logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# Writing happens on the listener thread; flush what's queued on exit
+listener = queue_logging(logger, file_and_console_handlers())
+atexit.register(listener.stop)
 
 # Ensure the report data directory exists
-folder_exists(REPORT_DATA_DIR)
\ No newline at end of file
+folder_exists(REPORT_DATA_DIR)
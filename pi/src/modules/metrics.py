@@ -0,0 +1,149 @@
+import threading
+import time
+
+class Histogram:
+    """
+    Fixed-memory latency histogram with HDR-style log-linear buckets: every power of two of
+    microseconds is split into `sub_buckets` equal buckets, so any recorded value is within
+    1/`sub_buckets` of its bucket (about 6% with the default 16) from 1 µs up to ~2 minutes.
+    """
+    def __init__(self, sub_buckets=16, max_shift=22):
+        self.sub_bits = sub_buckets.bit_length() - 1  # sub_buckets must be a power of two
+        self.sub_buckets = sub_buckets
+        self.counts = [0] * (sub_buckets * (max_shift + 2))
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0  # Seconds
+        self.min = None
+        self.max = None
+
+    def index(self, micros):
+        if micros < self.sub_buckets:
+            return micros
+        shift = micros.bit_length() - self.sub_bits - 1
+        return min(self.sub_buckets * (shift + 1) + (micros >> shift) - self.sub_buckets, len(self.counts) - 1)
+
+    def bucket_upper(self, index):
+        """
+        Returns the upper bound of a bucket in seconds.
+        """
+        if index < self.sub_buckets:
+            return (index + 1) / 1e6
+        shift = index // self.sub_buckets - 1
+        return ((index % self.sub_buckets + self.sub_buckets + 1) << shift) / 1e6
+
+    def record(self, seconds):
+        i = self.index(max(0, int(seconds * 1e6)))
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p):
+        """
+        Returns the latency in seconds that `p` percent of recorded values are at or below.
+        """
+        with self.lock:
+            if not self.count:
+                return None
+            target = max(1, round(self.count * p / 100))
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= target:
+                    return min(self.bucket_upper(i), self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else None,
+            "min_ms": round(self.min * 1000, 3) if self.count else None,
+            "p50_ms": round(self.percentile(50) * 1000, 3) if self.count else None,
+            "p90_ms": round(self.percentile(90) * 1000, 3) if self.count else None,
+            "p99_ms": round(self.percentile(99) * 1000, 3) if self.count else None,
+            "max_ms": round(self.max * 1000, 3) if self.count else None
+        }
+
+class Timer:
+    """
+    Context manager that records how long its block took into a stage's histogram.
+    """
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+
+class Metrics:
+    """
+    Per-stage latency histograms and event counters, cheap enough to leave on: recording a latency
+    is a bucket index calculation and a few additions under a lock.
+    """
+    def __init__(self):
+        self.histograms = {}  # stage -> Histogram
+        self.counters = {}  # name -> count
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).record(seconds)
+
+    def timer(self, stage):
+        return Timer(self.histogram(stage))
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = dict(self.histograms)
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "counters": counters,
+            "latency": {stage: histogram.snapshot() for stage, histogram in sorted(histograms.items())}
+        }
+
+    def prometheus_text(self, extra_counters=None):
+        """
+        Renders the metrics in the Prometheus text format: counters, plus a summary
+        (count, sum and quantiles) per stage.
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = dict(self.histograms)
+        counters.update(extra_counters or {})
+
+        lines = []
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE ninas_{name}_total counter")
+            lines.append(f"ninas_{name}_total {value}")
+
+        lines.append("# TYPE ninas_stage_latency_seconds summary")
+        for stage, histogram in sorted(histograms.items()):
+            for quantile in (0.5, 0.9, 0.99):
+                value = histogram.percentile(quantile * 100)
+                if value is not None:
+                    lines.append(f'ninas_stage_latency_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'ninas_stage_latency_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'ninas_stage_latency_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()  # Shared instance
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from config import MODEL_DIR, MODEL_PATH, MODELS_LOADED_MAX
+from modules.interpreter_pool import InterpreterPool
+from modules.logger import logger
+
+class Model:
+    """
+    A loaded model: a warmed-up interpreter pool plus the input and output properties read from the model itself.
+    """
+    def __init__(self, name, path):
+        self.name = name
+        self.path = str(path)
+
+        start = time.perf_counter()
+        self.pool = InterpreterPool(model_path=self.path)  # Interpreters are warmed up on creation
+        self.load_time = time.perf_counter() - start
+
+        input_details = self.pool.input_details[0]
+        output_details = self.pool.output_details[0]
+        self.input_shape = tuple(int(v) for v in input_details['shape'][1:])  # (height, width, channels)
+        self.input_size = (self.input_shape[1], self.input_shape[0])  # (width, height) for cv2
+        self.input_dtype = input_details['dtype']
+        self.input_quantization = input_details['quantization']  # (scale, zero point), (0.0, 0) if not quantized
+        self.output_quantization = output_details['quantization']
+        self.latency = self.measure_latency()
+
+    def measure_latency(self, runs=5):
+        """
+        Returns the median invoke time in seconds on a blank input.
+        """
+        times = []
+        with self.pool.interpreter() as runner:
+            runner.set_batch_size(1)
+            for _ in range(runs):
+                start = time.perf_counter()
+                runner.interpreter.invoke()
+                times.append(time.perf_counter() - start)
+        return float(np.median(times))
+
+    def dequantize(self, output):
+        """
+        Converts raw model output into confidence scores in 0-100% (float32).
+        """
+        scale, zero_point = self.output_quantization
+        if not scale:
+            return np.multiply(output, 100.0, dtype=np.float32)  # Float model: already probabilities
+        return np.multiply(np.subtract(output, zero_point, dtype=np.float32), scale * 100.0, dtype=np.float32)
+
+    def info(self):
+        return {
+            "name": self.name,
+            "path": self.path,
+            "input_shape": list(self.input_shape),
+            "input_dtype": np.dtype(self.input_dtype).name,
+            "input_quantization": list(self.input_quantization),
+            "output_quantization": list(self.output_quantization),
+            "load_ms": round(self.load_time * 1000, 1),
+            "invoke_ms": round(self.latency * 1000, 1)
+        }
+
+class ModelRegistry:
+    """
+    Loads models from MODEL_DIR by name (the file name without .tflite) and keeps one active.
+    Swapping the active model is a single reference assignment, so inference in flight finishes
+    on the old model and the next frame uses the new one without any frames being dropped.
+    At most `max_loaded` models stay loaded; the least recently active ones beyond that have their
+    interpreter pools closed, so repeated swaps don't keep growing memory.
+    """
+    def __init__(self, model_dir=MODEL_DIR, max_loaded=MODELS_LOADED_MAX):
+        self.model_dir = Path(model_dir)
+        self.max_loaded = max(max_loaded, 1)
+        self.models = OrderedDict()  # name -> loaded Model, least recently active first
+        self.active = None
+        self.lock = threading.Lock()  # Serializes loading; reads of `active` don't need it
+
+    def available(self):
+        return sorted(path.stem for path in self.model_dir.glob("*.tflite"))
+
+    def load(self, name):
+        """
+        Loads (or returns the already loaded) model called `name`.
+        """
+        with self.lock:
+            if name not in self.models:
+                path = self.model_dir / f"{name}.tflite"
+                if not path.exists():
+                    raise ValueError(f"Model not found: {name} (available: {', '.join(self.available())})")
+                model = Model(name, path)
+                self.models[name] = model
+                logger.info(f"Loaded model {name}: {model.load_time * 1000:.1f} ms to load, {model.latency * 1000:.1f} ms per invoke, input {model.input_shape} {np.dtype(model.input_dtype).name}.")
+            return self.models[name]
+
+    def activate(self, name):
+        """
+        Loads and warms up the model if needed, then makes it the active one.
+        """
+        model = self.load(name)
+        previous, self.active = self.active, model
+        if previous is not model:
+            logger.info(f"Active model is now {name}" + (f" (was {previous.name})." if previous else "."))
+        self.unload_inactive()
+        return model
+
+    def unload_inactive(self):
+        """
+        Closes the least recently active models beyond `max_loaded`. Frames already being classified
+        by one finish first; its interpreters are freed as they're checked back in.
+        """
+        with self.lock:
+            if self.active is not None and self.active.name in self.models:
+                self.models.move_to_end(self.active.name)
+            while len(self.models) > self.max_loaded:
+                name, model = self.models.popitem(last=False)
+                model.pool.close()
+                logger.info(f"Unloaded model {name}.")
+
+default_model_name = Path(MODEL_PATH).stem  # Model activated at startup
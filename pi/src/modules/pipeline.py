@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+from modules.logger import logger
+from modules.metrics import metrics
+
+class StageQueue:
+    """
+    Bounded queue between two pipeline stages. When it is full the oldest item is dropped,
+    so downstream stages always work on the newest frame.
+    """
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.queue = queue.Queue(maxsize)
+        self.lock = threading.Lock()
+        self.dropped = 0  # Items dropped because the queue was full
+        self.max_depth = 0  # Deepest the queue has been
+
+    def put(self, item):
+        with self.lock:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()  # Drop the oldest item to make room
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def get(self, timeout=None):
+        """
+        Returns the next item, or None if nothing arrives within `timeout` seconds.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stats(self):
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "capacity": self.queue.maxsize,
+            "dropped": self.dropped
+        }
+
+class Stage:
+    """
+    A pipeline stage: one or more worker threads that take items from `input_queue`, pass them
+    to `process` and put any non-None result on `output_queue`.
+    A stage without an input queue is a source: it calls `process()` with no arguments until it raises StopIteration.
+    `idle` is called whenever a worker wakes up without an item, at least every `poll_interval` seconds.
+    """
+    def __init__(self, name, process, input_queue=None, output_queue=None, workers=1, idle=None, poll_interval=0.1):
+        self.name = name
+        self.process = process
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.idle = idle
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+        self.threads = [
+            threading.Thread(target=self.run, name=f"{name}-{i}", daemon=True) for i in range(workers)
+        ]
+        self.processed = 0  # Items processed by this stage
+        self.errors = 0  # Items that raised an exception
+        self.busy_time = 0.0  # Seconds spent in `process`
+        self.profile = None  # Set by modules.profiler while a cProfile session is running
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def is_alive(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def run(self):
+        while not self.stopped.is_set():
+            if self.input_queue is not None:
+                item = self.input_queue.get(timeout=self.poll_interval)
+                if item is None:
+                    if self.idle:
+                        self.idle()
+                    continue
+                args = (item,)
+            else:
+                args = ()
+
+            start = time.perf_counter()
+            profile = self.profile
+            try:
+                result = self.process(*args) if profile is None else profile.run(self.process, *args)
+            except StopIteration:
+                logger.info(f"Pipeline stage {self.name} finished.")
+                break
+            except Exception as e:
+                self.errors += 1
+                logger.exception(f"Error in pipeline stage {self.name}: {e}")
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+                self.busy_time += elapsed
+                if args:
+                    metrics.observe(f"stage.{self.name}", elapsed)  # Source stages mostly time their own waiting
+
+            self.processed += 1
+            if result is not None and self.output_queue is not None:
+                self.output_queue.put(result)
+
+    def stats(self):
+        return {
+            "workers": len(self.threads),
+            "processed": self.processed,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_time, 3)
+        }
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded queues.
+    """
+    def __init__(self, stages, queues):
+        self.stages = stages
+        self.queues = queues
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+
+    def is_alive(self):
+        return all(stage.is_alive() for stage in self.stages)
+
+    def stats(self):
+        """
+        Per-stage counters and per-queue depths, for the metrics routes.
+        """
+        return {
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+            "queues": {q.name: q.stats() for q in self.queues}
+        }
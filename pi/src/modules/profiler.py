@@ -0,0 +1,153 @@
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from config import PROFILE_SAMPLE_INTERVAL
+from modules.logger import logger
+
+class ProfilerBusy(Exception):
+    """
+    Raised when a profiling session is requested while another one is running.
+    """
+
+class StageProfiler:
+    """
+    cProfile for pipeline stage workers. While a session is running each stage's `profile` is set
+    to this object, and its workers call `process` through `run()`, each thread with its own
+    cProfile.Profile (a profile only sees the thread it was enabled on).
+    Only one call is profiled at a time: from Python 3.12 cProfile sits on sys.monitoring, which allows a
+    single active profiler per process, and enabling a second one raises ValueError. Calls that come in
+    while another is being profiled, or while some other tool (a debugger, coverage) holds the slot, run
+    unprofiled, so the stats are a sample of the stage work rather than all of it.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profiles = []
+        self.active = False  # A call is being profiled
+        self.idle = threading.Condition(self.lock)
+        self.closed = False  # Set once the results are being collected
+
+    def run(self, process, *args):
+        with self.lock:
+            if self.closed or self.active:
+                # The session just ended, or another worker's call is being profiled
+                return process(*args)
+            profile = getattr(self.local, "profile", None)
+            if profile is None:
+                profile = self.local.profile = cProfile.Profile()
+                self.profiles.append(profile)
+            self.active = True
+        try:
+            try:
+                profile.enable()
+            except ValueError:  # Another profiling tool is already active (Python 3.12+)
+                return process(*args)
+            try:
+                return process(*args)
+            finally:
+                profile.disable()
+        finally:
+            with self.lock:
+                self.active = False
+                self.idle.notify_all()
+
+    def stats(self, timeout=5):
+        """
+        Waits for calls still being profiled to finish and returns the merged stats, or None if nothing ran.
+        """
+        with self.lock:
+            self.closed = True
+            self.idle.wait_for(lambda: not self.active, timeout)
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+class Profiler:
+    """
+    On-demand, time-boxed profiling of the running process; only one session at a time.
+    Nothing is hooked in between sessions, so there is no overhead when it isn't in use.
+    """
+    def __init__(self, sample_interval=PROFILE_SAMPLE_INTERVAL):
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()  # Held for the length of a session
+        self.last_session = None
+
+    @contextmanager
+    def session(self):
+        if not self.lock.acquire(blocking=False):
+            raise ProfilerBusy("A profiling session is already running.")
+        try:
+            yield
+        finally:
+            self.lock.release()
+
+    def profile_stages(self, stages, seconds):
+        """
+        Profiles the pipeline stage workers with cProfile for `seconds`.
+        Returns the pstats file contents (load with pstats.Stats or snakeviz), or None if no stage did any work.
+        """
+        with self.session():
+            logger.info(f"Profiling pipeline stages with cProfile for {seconds}s...")
+            profiler = StageProfiler()
+            for stage in stages:
+                stage.profile = profiler
+            try:
+                time.sleep(seconds)
+            finally:
+                for stage in stages:
+                    stage.profile = None
+            stats = profiler.stats()
+            self.last_session = {"mode": "cprofile", "seconds": seconds, "finished": time.time()}
+            if stats is None:
+                return None
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "profile.pstats")
+                stats.dump_stats(path)
+                with open(path, "rb") as f:
+                    return f.read()
+
+    def sample_stacks(self, seconds):
+        """
+        Samples the stack of every other thread every `sample_interval` seconds for `seconds`.
+        Returns the samples in the collapsed-stack format ("thread;outer;...;inner count" per line)
+        read by flamegraph.pl and speedscope.
+        """
+        with self.session():
+            logger.info(f"Sampling all thread stacks for {seconds}s...")
+            own_thread = threading.get_ident()
+            counts = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_thread:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    counts[";".join(reversed(stack))] += 1
+                samples += 1
+                time.sleep(self.sample_interval)
+            self.last_session = {"mode": "sample", "seconds": seconds, "samples": samples, "finished": time.time()}
+            logger.info(f"Took {samples} stack samples.")
+            return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+    def stats(self):
+        return {"running": self.lock.locked(), "last_session": self.last_session}
+
+profiler = Profiler()  # Shared instance
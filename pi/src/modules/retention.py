@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from pathlib import Path
+from config import REPORT_DATA_DIR, CLASS_LABELS, RETENTION_BUDGET_MB, RETENTION_TARGET, RETENTION_POLICIES, RETENTION_INTERVAL
+from modules.store import store
+from modules.utils import repo_root
+from modules.logger import logger
+
+report_data_dir = repo_root / REPORT_DATA_DIR  # Where every report image is saved
+
+def file_category(name):
+    """
+    Returns the retention category of a report image from its file name.
+    """
+    if name.startswith("TestCase_"):
+        return "test_case"
+    if name.startswith("BuzzFrame_"):
+        return "buzz_frame"
+    if name.split("-")[0] in CLASS_LABELS:
+        return "detection"  # e.g. Mila-20250101120000.jpg
+    return "other"  # Never evicted (e.g. debug.jpg)
+
+class RetentionManager(threading.Thread):
+    """
+    Keeps REPORT_DATA_DIR within RETENTION_BUDGET_MB.
+    Every saved image is added to a size index in the store, so the folder is only scanned once,
+    on the first start (recorded in the store). load_index() must run before `track` is registered
+    with the image writer. A low-priority thread deletes files past their category's
+    max age, and when the folder is over budget it deletes the oldest files category by category
+    (in RETENTION_POLICIES order) until usage is back under RETENTION_TARGET of the budget.
+    Frames referenced by a test case or buzz event are never deleted.
+    """
+    def __init__(self, directory=report_data_dir, budget_mb=RETENTION_BUDGET_MB, policies=RETENTION_POLICIES, interval=RETENTION_INTERVAL):
+        super().__init__(name="retention", daemon=True)
+        self.directory = Path(directory)
+        self.budget = budget_mb * 1024 * 1024
+        self.policies = policies
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.usage = {}  # category -> [file count, bytes]
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+
+    def load_index(self):
+        """
+        Loads the usage totals from the index, scanning the folder first if it never has been.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if not store.migration_applied("report_files_scanned"):
+            self.scan()
+            store.mark_migration_applied("report_files_scanned")
+        usage = store.report_file_usage()
+        with self.lock:
+            self.usage = {category: list(values) for category, values in usage.items()}
+        logger.info(f"Report images: {self.total_bytes() / 1024 / 1024:.1f} MB of {self.budget / 1024 / 1024:.0f} MB budget.")
+
+    def scan(self):
+        """
+        Indexes the files already in the folder. Only needed once.
+        """
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    info = entry.stat()
+                    files.append((entry.name, file_category(entry.name), info.st_size, info.st_mtime))
+        store.track_report_files(files)
+        logger.info(f"Indexed {len(files)} existing report images.")
+
+    def track(self, path):
+        """
+        Adds a newly written image to the index. Called by the image writer after each write.
+        """
+        path = Path(path)
+        if path.parent.resolve() != self.directory.resolve():
+            return
+        size = path.stat().st_size
+        category = file_category(path.name)
+        with self.lock:  # Image writer workers can rewrite the same name at once
+            replaced = store.track_report_file(path.name, category, size, time.time())
+            if replaced:
+                # Names only change once a second, so a burst overwrites the same file; count it once
+                old_category, old_size = replaced
+                count, total = self.usage.get(old_category, [0, 0])
+                self.usage[old_category] = [max(count - 1, 0), max(total - old_size, 0)]
+            count, total = self.usage.get(category, [0, 0])
+            self.usage[category] = [count + 1, total + size]
+        if self.total_bytes() > self.budget:
+            self.wake.set()  # Don't wait for the next interval
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(total for _, total in self.usage.values())
+
+    def run(self):
+        lower_thread_priority()
+        while not self.stopped.is_set():
+            try:
+                self.enforce()
+            except Exception as e:
+                logger.exception(f"Retention error: {e}")
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+    def enforce(self):
+        # Age limits first, regardless of usage
+        for category, policy in self.policies.items():
+            if policy.get("max_age_days"):
+                cutoff = time.time() - policy["max_age_days"] * 86400
+                while not self.stopped.is_set() and self.evict(store.evictable_report_files(category, older_than=cutoff)):
+                    pass
+
+        # Then the budget, oldest files of the first category first
+        if self.total_bytes() <= self.budget:
+            return
+        target = self.budget * RETENTION_TARGET
+        for category in self.policies:
+            while not self.stopped.is_set() and self.total_bytes() > target:
+                if not self.evict(store.evictable_report_files(category)):
+                    break  # Nothing left to evict in this category
+        if self.total_bytes() > self.budget:
+            logger.warning(f"Report images use {self.total_bytes() / 1024 / 1024:.1f} MB, over the {self.budget / 1024 / 1024:.0f} MB budget, but everything left is referenced or protected.")
+
+    def evict(self, files):
+        """
+        Deletes a batch of (name, size) files and removes them from the index. Returns how many were deleted.
+        """
+        for name, _ in files:
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass  # Deleted by hand; just drop it from the index
+        store.untrack_report_files([name for name, _ in files])
+
+        with self.lock:
+            for name, size in files:
+                category = file_category(name)
+                count, total = self.usage.get(category, [0, 0])
+                self.usage[category] = [max(count - 1, 0), max(total - size, 0)]
+            self.evicted += len(files)
+            self.evicted_bytes += sum(size for _, size in files)
+        if files:
+            logger.info(f"Retention deleted {len(files)} report images ({sum(size for _, size in files) / 1024:.0f} KB).")
+            time.sleep(0.05)  # Leave the SD card to the detection pipeline between batches
+        return len(files)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "budget_mb": round(self.budget / 1024 / 1024, 1),
+                "used_mb": round(sum(total for _, total in self.usage.values()) / 1024 / 1024, 1),
+                "categories": {category: {"files": count, "mb": round(total / 1024 / 1024, 1)} for category, (count, total) in self.usage.items()},
+                "evicted_files": self.evicted,
+                "evicted_mb": round(self.evicted_bytes / 1024 / 1024, 1)
+            }
+
+def lower_thread_priority():
+    """
+    Makes the calling thread the lowest CPU priority. On Linux, niceness applies per thread.
+    """
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Could not lower retention thread priority: {e}")
+
+retention = RetentionManager()  # Shared instance; started by main.py
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import cv2
+import numpy as np
+from config import BOWL_ROI, ROI_JSON_PATH
+from modules.logger import logger
+
+def normalize_region(region):
+    """
+    Converts a rectangle (x, y, w, h) or a polygon [(x, y), ...] into a list of polygon points.
+    Returns None for an empty region, meaning the whole frame.
+    """
+    if not region:
+        return None
+    if len(region) == 4 and all(isinstance(v, (int, float)) for v in region):
+        x, y, w, h = region
+        if w <= 0 or h <= 0:
+            raise ValueError(f"Invalid ROI rectangle: {region}")
+        return [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+    points = [(int(point[0]), int(point[1])) for point in region]
+    if len(points) < 3:
+        raise ValueError(f"ROI polygon needs at least 3 points: {region}")
+    return points
+
+class RegionOfInterest:
+    """
+    The bowl area of the frame. Masks and crop coordinates are computed once per frame size
+    and reused until the region changes.
+    """
+    def __init__(self, region=None):
+        self.lock = threading.Lock()
+        self.version = 0  # Bumped whenever the region changes
+        self.set(region)
+
+    def set(self, region):
+        """
+        Replaces the region and invalidates everything precomputed from it.
+        """
+        points = normalize_region(region)
+        with self.lock:
+            self.points = points
+            self.masks = {}  # (height, width, scale) -> uint8 mask
+            self.crops = {}  # (height, width) -> (top, bottom, left, right)
+            self.version += 1
+
+    def mask(self, shape, scale=1.0):
+        """
+        Returns a uint8 mask (255 inside the region) for an image of `shape` whose pixels
+        are `scale` frame pixels wide, or None when the region is the whole frame.
+        """
+        if self.points is None:
+            return None
+        key = (shape[0], shape[1], scale)
+        with self.lock:
+            if key not in self.masks:
+                mask = np.zeros(shape[:2], np.uint8)
+                polygon = np.round(np.array(self.points, np.float32) / scale).astype(np.int32)
+                cv2.fillPoly(mask, [polygon], 255)
+                self.masks[key] = mask
+            return self.masks[key]
+
+    def crop(self, frame_shape):
+        """
+        Returns the (top, bottom, left, right) square crop for inference: the smallest square
+        around the region that fits in the frame, or the top-left square without a region.
+        """
+        height, width = frame_shape[:2]
+        key = (height, width)
+        with self.lock:
+            if key not in self.crops:
+                size = min(height, width)
+                if self.points is None:
+                    top, left = 0, 0
+                else:
+                    x, y, w, h = cv2.boundingRect(np.array(self.points, np.int32))
+                    size = min(max(w, h), size)
+                    left = min(max(x + w // 2 - size // 2, 0), width - size)
+                    top = min(max(y + h // 2 - size // 2, 0), height - size)
+                self.crops[key] = (top, top + size, left, left + size)
+            return self.crops[key]
+
+    def to_json(self):
+        return {"polygon": [list(point) for point in self.points] if self.points else None}
+
+def load_roi():
+    """
+    Loads the ROI saved from the Flask route, falling back to BOWL_ROI from config.
+    """
+    if os.path.exists(ROI_JSON_PATH):
+        try:
+            with open(ROI_JSON_PATH, "r") as f:
+                return json.load(f)["polygon"]
+        except (ValueError, KeyError) as e:
+            logger.error(f"Failed to load ROI from {ROI_JSON_PATH}: {e}")
+    return BOWL_ROI
+
+def save_roi(region):
+    """
+    Applies a new ROI and saves it so it survives restarts.
+    """
+    bowl_roi.set(region)
+    with open(ROI_JSON_PATH, "w") as f:
+        json.dump(bowl_roi.to_json(), f)
+    logger.info(f"Bowl ROI updated: {bowl_roi.points}")
+
+bowl_roi = RegionOfInterest(load_roi())  # Shared by motion detection and inference
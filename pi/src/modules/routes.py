@@ -1,10 +1,23 @@
-from flask import Flask, send_file, render_template_string, Response
+from flask import Flask, send_file, render_template_string, Response, request, jsonify
 import cv2
 import datetime
-from config import REPORT_DATA_DIR, LOG_FILE
+from config import REPORT_DATA_DIR, LOG_FILE, STREAM_JPEG_QUALITY, STREAM_MAX_FPS, PROFILE_MAX_SECONDS
+import io
 import time
 import modules.testing as test
 from modules.state import app_state as state
+from modules.roi import bowl_roi, save_roi
+from modules.image_processing import registry, activate_model
+from modules.inference_cache import inference_cache
+from modules.image_writer import image_writer
+from modules.jpeg_cache import jpeg_cache
+from modules.broadcaster import broadcaster
+from modules.retention import retention
+from modules.api import outbox
+from modules.log_tailer import log_tailer
+from modules.metrics import metrics
+from modules.simulated_camera import simulated_camera
+from modules.profiler import profiler, ProfilerBusy
 
 # Flask App
 app = Flask(__name__)
@@ -128,58 +141,223 @@ def simulate_camera(dog):
         return str(e), 404
 
 
+@app.route('/pipeline')
+def pipeline_stats():
+    """
+    Shows per-stage counters and queue depths of the detection pipeline, plus capture buffer drops
+    and the frames the scheduler held back while idle.
+    """
+    if state.pipeline is None:
+        return jsonify({"error": "Pipeline not running."}), 503
+    stats = state.pipeline.stats()
+    stats["frame_buffer"] = state.frame_buffer.stats()
+    stats["scheduler"] = state.scheduler.stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def metrics_text():
+    """
+    Per-stage latency summaries and event counters in the Prometheus text format.
+    """
+    return Response(metrics.prometheus_text(component_counters()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics.json')
+def metrics_json():
+    """
+    Per-stage latency percentiles (ms) and event counters as JSON.
+    """
+    snapshot = metrics.snapshot()
+    snapshot["counters"].update(component_counters())
+    return jsonify(snapshot)
+
+def component_counters():
+    """
+    Counters kept by the components themselves (drops and cache hits), for the metrics routes.
+    """
+    counters = {
+        "inference_cache_hits": inference_cache.hits,
+        "inference_cache_misses": inference_cache.misses,
+        "images_dropped": image_writer.dropped
+    }
+    if state.frame_buffer:
+        counters["frames_dropped"] = state.frame_buffer.dropped_frames
+        counters["frames_stale"] = state.frame_buffer.stale_frames
+    if state.pipeline:
+        counters["queue_dropped"] = sum(q.dropped for q in state.pipeline.queues)
+    return counters
+
+@app.route('/inference_cache')
+def inference_cache_stats():
+    """
+    Shows how many invocations the inference cache has saved.
+    """
+    return jsonify(inference_cache.stats())
+
+@app.route('/image_writer')
+def image_writer_stats():
+    """
+    Shows the background image writer's backlog, drops and write latency.
+    """
+    return jsonify(image_writer.stats())
+
+@app.route('/simulated_camera')
+def simulated_camera_stats():
+    """
+    Shows the simulated camera's image set, decoded-frame cache and prefetch hit rate.
+    """
+    return jsonify(simulated_camera.stats())
+
+@app.route('/retention')
+def retention_stats():
+    """
+    Shows report image disk usage per category against the retention budget.
+    """
+    return jsonify(retention.stats())
+
+@app.route('/outbox')
+def outbox_stats():
+    """
+    Shows visits waiting to be uploaded and the outbox's send counters.
+    """
+    return jsonify(outbox.stats())
+
+@app.route('/buzz_latency')
+def buzz_latency():
+    """
+    Shows how long Nova's buzzes took from motion onset to the bowl vibrating: every buzz event with its
+    stage latencies and whether it vibrated, the end-to-end latencies per day, and each stage overall.
+    ?days= limits the report to recent buzz events (default 30).
+    """
+    days = request.args.get("days", default=30, type=int)
+    since = datetime.datetime.now() - datetime.timedelta(days=days)
+    return jsonify(test.buzz_latency_report(since))
+
+@app.route('/profile')
+def profile():
+    """
+    Profiles the running process for ?seconds= (default 10, at most PROFILE_MAX_SECONDS) and downloads the result.
+    ?mode=sample (default) samples every thread's stack and returns a collapsed-stack file for a flame graph;
+    ?mode=cprofile runs cProfile on the pipeline stage workers and returns a pstats file.
+    Only one session runs at a time.
+    """
+    mode = request.args.get("mode", "sample")
+    seconds = min(max(request.args.get("seconds", 10, type=float), 1), PROFILE_MAX_SECONDS)
+    stamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    try:
+        if mode == "sample":
+            data = profiler.sample_stacks(seconds).encode()
+            return send_file(io.BytesIO(data), mimetype="text/plain", as_attachment=True, download_name=f"ninas-{stamp}.collapsed")
+        if mode == "cprofile":
+            if not state.pipeline:
+                return jsonify({"error": "Pipeline not running."}), 503
+            data = profiler.profile_stages(state.pipeline.stages, seconds)
+            if data is None:
+                return jsonify({"error": f"No pipeline stage did any work in {seconds}s."}), 503
+            return send_file(io.BytesIO(data), mimetype="application/octet-stream", as_attachment=True, download_name=f"ninas-{stamp}.pstats")
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e), "profiler": profiler.stats()}), 409
+    return jsonify({"error": f"Unknown mode: {mode} (expected sample or cprofile)"}), 400
+
+@app.route('/models')
+def models():
+    """
+    Lists the available models, the ones loaded (with their load time and latency) and the active one.
+    """
+    return jsonify({
+        "active": registry.active.name,
+        "available": registry.available(),
+        "loaded": [model.info() for model in registry.models.values()]
+    })
+
+@app.route('/models/<name>/activate', methods=['POST'])
+def activate(name):
+    """
+    Loads, warms up and switches to another model without stopping the detection pipeline.
+    POST only, so a prefetch or a stray link can't swap the model.
+    """
+    try:
+        model = activate_model(name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify(model.info())
+
+@app.route('/roi', methods=['GET', 'POST'])
+def roi():
+    """
+    Shows or updates the bowl region of interest.
+    POST a JSON body with either {"rect": [x, y, w, h]} or {"polygon": [[x, y], ...]}; an empty body clears it.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            save_roi(data.get("rect") or data.get("polygon"))
+        except (ValueError, TypeError, IndexError) as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify(bowl_roi.to_json())
+
 @app.route('/video_feed')
 def video_feed():
     """
-    Serve the current frame as an MJPEG stream.
-    This implementation adds a small delay to avoid CPU overload and ensures thread-safe access to `curr_frame`.
+    Serve new frames as an MJPEG stream as soon as the camera captures them.
+    Frames are encoded once in the shared JPEG cache, so more viewers don't mean more encoding.
+    Optional ?fps=<max>&quality=<1-100>&width=<pixels> pick a slower or smaller variant.
     """
-    print("serving video feed...")
-    def generate():
-        
-        while True:
-            # Check if curr_frame is available
-            if state.curr_frame is not None:
-                # Encode the current frame as JPEG
-                _, buffer = cv2.imencode('.jpg', state.curr_frame)
-                frame = buffer.tobytes()
+    quality, width = stream_variant()
+    max_fps = max(request.args.get("fps", STREAM_MAX_FPS, type=float), 0.1)
+    return Response(broadcaster.stream(max_fps, quality, width), mimetype='multipart/x-mixed-replace; boundary=frame')
 
-                # Yield the frame as part of the multipart MJPEG stream
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+@app.route('/snapshot.jpg')
+def snapshot():
+    """
+    Serve the newest frame as a single JPEG, sharing the encoded bytes with the video feed.
+    """
+    frame = state.frame_buffer.latest() if state.frame_buffer else None
+    if frame is None:
+        return "No frame captured yet.", 503
+    quality, width = stream_variant()
+    return Response(jpeg_cache.get(frame, quality, width), mimetype='image/jpeg', headers={"Cache-Control": "no-store"})
 
-            # Introduce a short delay to reduce CPU usage and allow other threads to run
-            time.sleep(0.1)
+@app.route('/stream')
+def stream_stats():
+    """
+    Shows the connected video feed clients and how many frames were encoded for them.
+    """
+    stats = broadcaster.stats()
+    stats["jpeg_cache"] = jpeg_cache.stats()
+    return jsonify(stats)
 
-    # Return the MJPEG stream response
-    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+def stream_variant():
+    """
+    Reads the JPEG quality and width for a streaming route from the query string.
+    """
+    quality = min(max(request.args.get("quality", STREAM_JPEG_QUALITY, type=int), 1), 100)
+    width = request.args.get("width", type=int)
+    return quality, width if width and width > 0 else None
 
 @app.route('/stream-reversed-logs')
 def stream_reversed_logs():
     """
     Streams the log file content in reversed order (bottom to top) using Server-Sent Events (SSE).
-    Continuously streams new updates.
+    Continuously streams new updates from the shared log tailer, so clients cost no disk reads.
+    Reconnecting clients resume after the Last-Event-ID header (or ?last_id=) they send.
     """
+    log_tailer.ensure_started()
+    resume_id = log_tailer.resume_after(request.headers.get("Last-Event-ID", request.args.get("last_id")))
     def generate():
-        last_position = 0  # Track file position
+        after_id = resume_id
+        yield "retry: 2000\n\n"
         while True:
-            if not os.path.exists(LOG_FILE):
-                yield "data: Log file not found.\n\n"
-                break
-
-            with open(LOG_FILE, 'r') as f:
-                f.seek(0, os.SEEK_END)  # Move to end of file
-                new_position = f.tell()
-
-                # If the file has grown, read from the last position
-                if new_position > last_position:
-                    f.seek(last_position)
-                    lines = f.readlines()
-                    reversed_lines = lines[::-1]  # Reverse the lines
-                    for line in reversed_lines:
-                        yield f"data: {line.strip()}\n\n"
-
-                last_position = new_position  # Update the last position
-                time.sleep(1)  # Wait before checking for new content
-
-    return Response(generate(), mimetype='text/event-stream')
\ No newline at end of file
+            lines = log_tailer.wait_for_lines(after_id, timeout=15)
+            if not lines:
+                yield ": keepalive\n\n"  # Lets a closed connection be noticed
+                continue
+
+            # Newest line first; the id goes on the last event sent, so Last-Event-ID
+            # ends up as the newest line the client has
+            after_id = lines[-1][0]
+            reversed_lines = lines[::-1]
+            for line_id, line in reversed_lines[:-1]:
+                yield f"data: {line.strip()}\n\n"
+            yield f"id: {log_tailer.event_id(after_id)}\ndata: {reversed_lines[-1][1].strip()}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,93 @@
+import threading
+import time
+import cv2
+import numpy as np
+from config import IDLE_FPS, CAMERA_FPS, DETECTION_TIMEOUT, IDLE_CHANGE_PIXEL_THRESHOLD, IDLE_CHANGE_FRACTION
+from modules.roi import bowl_roi
+
+class FrameScheduler:
+    """
+    Paces frame capture at the camera rate and decides which frames go on to the detection pipeline.
+    While there is motion every frame does, until DETECTION_TIMEOUT seconds after the last motion.
+    While the bowl is quiet only one frame per idle period does, plus any frame that a cheap check
+    (a 32x24 grayscale thumbnail of the bowl area) finds changed since the last frame passed on,
+    so a dog arriving is seen within one camera frame instead of up to one idle period.
+    Waits sleep until the next frame's deadline instead of spinning.
+    """
+    def __init__(self, idle_fps=IDLE_FPS, burst_fps=CAMERA_FPS, decay=DETECTION_TIMEOUT,
+                 change_threshold=IDLE_CHANGE_PIXEL_THRESHOLD, change_fraction=IDLE_CHANGE_FRACTION):
+        self.idle_period = 1.0 / idle_fps
+        self.period = 1.0 / burst_fps
+        self.decay = decay
+        self.change_threshold = change_threshold
+        self.change_fraction = change_fraction
+        self.last_motion = float("-inf")  # time.monotonic() of the last motion
+        self.last_frame = time.monotonic()  # Deadline the last frame was taken for
+        self.last_passed = float("-inf")  # time.monotonic() the last idle frame was passed on
+        self.reference = None  # Thumbnail of the last idle frame passed on
+        self.wake = threading.Event()  # Set to cut a sleep short
+
+        # Metrics
+        self.skipped = 0  # Idle frames that didn't change and weren't due
+        self.changed = 0  # Idle frames passed on early because they changed
+
+    def notify_motion(self):
+        """
+        Passes every frame on until the motion has been gone for `decay` seconds.
+        """
+        self.last_motion = time.monotonic()
+
+    def bursting(self):
+        return time.monotonic() - self.last_motion < self.decay
+
+    def wait(self, stopped=None):
+        """
+        Sleeps until the next frame is due. Returns early if `stopped` (an Event) gets set.
+        """
+        while not (stopped and stopped.is_set()):
+            self.wake.clear()
+            deadline = self.last_frame + self.period
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Keep a steady cadence, but don't try to catch up on frames we were too late for
+                self.last_frame = deadline if -remaining < self.period else time.monotonic()
+                return
+            self.wake.wait(remaining)
+
+    def should_process(self, image):
+        """
+        Returns True if a captured frame should go on to the detection pipeline.
+        """
+        if self.bursting():
+            self.reference = None
+            return True
+
+        thumbnail = bowl_thumbnail(image)
+        now = time.monotonic()
+        changed = self.reference is not None and self.change(thumbnail) > self.change_fraction
+        if not changed and now - self.last_passed < self.idle_period:
+            self.skipped += 1
+            return False
+        if changed:
+            self.changed += 1
+        self.reference = thumbnail
+        self.last_passed = now
+        return True
+
+    def change(self, thumbnail):
+        """
+        Fraction of thumbnail cells that changed by more than `change_threshold` since the reference.
+        """
+        return np.count_nonzero(cv2.absdiff(thumbnail, self.reference) > self.change_threshold) / thumbnail.size
+
+    def stats(self):
+        return {
+            "bursting": self.bursting(),
+            "skipped_idle_frames": self.skipped,
+            "changed_idle_frames": self.changed
+        }
+
+def bowl_thumbnail(image):
+    top, bottom, left, right = bowl_roi.crop(image.shape)
+    thumbnail = cv2.resize(image[top:bottom, left:right], (32, 24), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
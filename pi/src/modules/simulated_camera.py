@@ -0,0 +1,228 @@
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+import cv2
+from config import SIMULATED_FPS, SIMULATED_PREFETCH, SIMULATED_CACHE_MB
+from modules.logger import logger
+
+class SimulatedCamera:
+    """
+    Feeds the images in a folder in place of camera frames, in order and looping.
+    Files are listed once and decoded lazily: a prefetch thread decodes the next `prefetch` frames
+    ahead of the reader into an LRU cache capped at `cache_mb`, so a large set never has to fit
+    in memory and switching sets doesn't decode anything up front.
+    `read()` hands out frames no faster than `fps`, like a real camera (0 for no limit).
+    """
+    def __init__(self, fps=SIMULATED_FPS, prefetch=SIMULATED_PREFETCH, cache_mb=SIMULATED_CACHE_MB):
+        self.period = 1.0 / fps if fps else 0.0
+        self.prefetch = prefetch
+        self.budget = cache_mb * 1024 * 1024
+        self.condition = threading.Condition()
+        self.directory = None
+        self.paths = []
+        self.index = 0  # Position in `paths` of the next frame to read
+        self.generation = 0  # Bumped by open(), so decodes for the previous folder are thrown away
+        self.cache = OrderedDict()  # path -> decoded image, least recently used first
+        self.cache_bytes = 0
+        self.decoding = None  # Path the prefetch thread is decoding right now
+        self.cache_full = False  # Prefetching pauses until the reader moves on
+        self.next_frame = 0.0  # time.monotonic() the next frame is due
+        self.thread = None
+
+        # Metrics
+        self.hits = 0  # Frames that were already decoded when read
+        self.misses = 0  # Frames the reader had to wait for
+        self.decoded = 0
+        self.failed = 0  # Files that couldn't be decoded (dropped from the set)
+        self.evicted = 0
+        self.total_decode_time = 0.0
+
+    def open(self, directory):
+        """
+        Switches to the images in `directory`, starting from the first one.
+        Only lists the files; decoding happens on the prefetch thread.
+        """
+        paths = sorted(Path(directory).glob("*.jpg"))
+        if not paths:
+            raise ValueError(f"No images found in directory: {directory}")
+
+        with self.condition:
+            self.directory = str(directory)
+            self.paths = paths
+            self.index = 0
+            self.generation += 1
+            self.cache.clear()
+            self.cache_bytes = 0
+            self.cache_full = False
+            self.next_frame = time.monotonic()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="simulated-camera", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+        logger.info(f"Simulating the camera with {len(paths)} images from {directory}.")
+
+    def read(self):
+        """
+        Returns the next frame, waiting for it to be due and decoded.
+        Raises ValueError if no folder is open or none of its images can be decoded.
+        """
+        self.pace()
+        while True:
+            with self.condition:
+                if not self.paths:
+                    raise ValueError("No simulated images loaded. Call update_simulated_images() first.")
+                path, generation = self.paths[self.index], self.generation
+                if path in self.cache:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    # Wait for the prefetch thread if it's already decoding this one
+                    self.condition.wait_for(lambda: self.decoding != path or generation != self.generation)
+                if generation != self.generation:
+                    continue
+                image = self.cache.get(path)
+                if image is not None:
+                    self.cache.move_to_end(path)
+                    self.advance()
+                    return image
+
+            # Not prefetched in time; decode it here
+            image = self.decode(path)
+            with self.condition:
+                if generation != self.generation:
+                    continue
+                if image is None:
+                    self.discard(path)
+                    continue
+                self.insert(path, image)
+                self.advance()
+                return image
+
+    def pace(self):
+        """
+        Sleeps until the next frame is due. A slow reader gets frames right away, one at a time.
+        """
+        if not self.period:
+            return
+        delay = self.next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame = max(self.next_frame + self.period, time.monotonic())
+
+    def run(self):
+        """
+        Prefetch thread: keeps the frames about to be read decoded.
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending() is not None)
+                path, generation = self.pending(), self.generation
+                self.decoding = path
+
+            image = self.decode(path)
+            with self.condition:
+                self.decoding = None
+                if generation == self.generation:
+                    if image is None:
+                        self.discard(path)
+                    elif not self.insert(path, image):
+                        self.cache_full = True  # Wait for the reader to free up room
+                self.condition.notify_all()
+
+    def pending(self):
+        """
+        Returns the first of the upcoming frames that isn't decoded yet, or None.
+        Call with the condition held.
+        """
+        if self.cache_full:
+            return None
+        for path in self.upcoming():
+            if path not in self.cache:
+                return path
+        return None
+
+    def upcoming(self):
+        """
+        Paths of the next `prefetch` frames to be read, next one first. Call with the condition held.
+        """
+        count = min(self.prefetch, len(self.paths))
+        return [self.paths[(self.index + i) % len(self.paths)] for i in range(count)]
+
+    def decode(self, path):
+        start = time.perf_counter()
+        image = cv2.imread(str(path))
+        decode_time = time.perf_counter() - start
+        with self.condition:
+            self.total_decode_time += decode_time
+            if image is None:
+                self.failed += 1
+            else:
+                self.decoded += 1
+        if image is None:
+            logger.warning(f"Could not decode simulated image {path}, skipping it.")
+        return image
+
+    def insert(self, path, image):
+        """
+        Caches a decoded frame, evicting the least recently used frames that aren't about to be read.
+        Returns False if there isn't room. Call with the condition held.
+        """
+        if path in self.cache:
+            return True  # Decoded by the reader and the prefetch thread at the same time
+        keep = set(self.upcoming())
+        for old in list(self.cache):
+            if self.cache_bytes + image.nbytes <= self.budget:
+                break
+            if old not in keep:
+                self.cache_bytes -= self.cache.pop(old).nbytes
+                self.evicted += 1
+        if self.cache_bytes + image.nbytes > self.budget:
+            return False
+        self.cache[path] = image
+        self.cache_bytes += image.nbytes
+        return True
+
+    def advance(self):
+        """
+        Moves on to the next frame and lets prefetching continue. Call with the condition held.
+        """
+        self.index = (self.index + 1) % len(self.paths)
+        self.cache_full = False
+        self.condition.notify_all()
+
+    def discard(self, path):
+        """
+        Drops an image that can't be decoded from the set. Call with the condition held.
+        """
+        if path not in self.paths:
+            return
+        position = self.paths.index(path)
+        self.paths.pop(position)
+        if position < self.index:
+            self.index -= 1
+        if self.index >= len(self.paths):
+            self.index = 0
+        self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            reads = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "images": len(self.paths),
+                "next_index": self.index,
+                "fps": round(1.0 / self.period, 2) if self.period else None,
+                "cached_frames": len(self.cache),
+                "cache_mb": round(self.cache_bytes / 1024 / 1024, 1),
+                "cache_budget_mb": round(self.budget / 1024 / 1024, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / reads, 3) if reads else None,
+                "decoded": self.decoded,
+                "failed": self.failed,
+                "evicted": self.evicted,
+                "avg_decode_ms": round(self.total_decode_time / (self.decoded + self.failed) * 1000, 2) if self.decoded + self.failed else None
+            }
+
+simulated_camera = SimulatedCamera()  # Shared instance
@@ -2,22 +2,32 @@
 class AppState:
     def __init__(self):
         # Camera state
-        self.cap = None  # VideoCapture object
+        self.camera = None  # CameraGrabber thread that owns the VideoCapture
+        self.frame_buffer = None  # FrameBuffer of recent frames filled by the camera thread
+        self.scheduler = None  # FrameScheduler pacing capture between idle and burst rates
+        self.pipeline = None  # Capture -> motion -> inference -> decision pipeline
         
         # Frame data
-        self.curr_frame = None  # Current frame from the camera
-        self.prev_frame = None  # Previous frame for motion detection
+        self.curr_frame = None  # Frame most recently acted on by the decision stage
 
         # Simulation settings
         self.use_dummy_images = False  # Flag to use dummy images
-        self.active_dummy_images = []  # List of loaded dummy images
-        self.current_image_index = 0  # Index for dummy image set
         self.current_buzz_event = None  # Current buzz event data
 
+        # Detection tracking
+        self.last_motion_time = 0  # Time of the last motion in the bowl area (clock.time())
+        self.motion_onset = None  # Capture time of the first motion frame after the bowl was quiet
+        self.last_not_nova_capture = None  # Capture time of the last frame classified as anything but Nova
+        self.detection_timings = None  # Stage timestamps of the frame behind the latest confident detection
+        self.last_decided_seq = 0  # Sequence number of the last frame the decision stage acted on
+        self.last_detected_dog = None  # Last dog detected with confidence
+        self.last_detected_time = None  # When that dog was detected
+
         # Visit event tracking
         self.last_mila_end_time = None  # Last time Mila's visit ended for safety buffer
         self.safety_buffer_active = False # Flag to suppress Nova detection
         self.current_visit = {"dog": None, "start_time": None, "end_time": None}  # Active visit data
+        self.visit_cache_start = None  # Inference cache stats when the active visit started
 
         # GPIO state
         self.gpio = None  # GPIO object (for vibration control)
@@ -0,0 +1,442 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from config import STORE_PATH
+
+# Use the shared "ninas" logger without importing modules.logger, so photo_reviewer.py
+# and the tools in pi/utilities can open the store without setting up the app's log files
+logger = logging.getLogger("ninas")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    dog TEXT NOT NULL,
+    start_time TEXT NOT NULL,  -- ISO 8601, sorts chronologically
+    end_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS visits_start_time ON visits (start_time);
+CREATE INDEX IF NOT EXISTS visits_dog_start_time ON visits (dog, start_time);
+
+CREATE TABLE IF NOT EXISTS test_cases (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,  -- %Y%m%d%H%M%S, sorts chronologically
+    file_path TEXT NOT NULL,  -- File name in REPORT_DATA_DIR
+    dog TEXT,
+    confidence_values TEXT NOT NULL,  -- JSON object
+    triggered_tests TEXT NOT NULL,  -- JSON array
+    copied_to TEXT  -- Training photo the frame was copied to, if any
+);
+CREATE INDEX IF NOT EXISTS test_cases_timestamp ON test_cases (timestamp);
+CREATE INDEX IF NOT EXISTS test_cases_file_path ON test_cases (file_path);
+
+CREATE TABLE IF NOT EXISTS buzz_events (
+    id INTEGER PRIMARY KEY,
+    start_time TEXT NOT NULL,
+    end_time TEXT,  -- NULL while the buzz is still going
+    timings TEXT  -- JSON object of clock.time() stage timestamps for motion-to-buzz latency
+);
+CREATE INDEX IF NOT EXISTS buzz_events_start_time ON buzz_events (start_time);
+
+CREATE TABLE IF NOT EXISTS buzz_frames (
+    id INTEGER PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES buzz_events (id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,  -- File name in REPORT_DATA_DIR
+    confidence_values TEXT NOT NULL  -- JSON object
+);
+CREATE INDEX IF NOT EXISTS buzz_frames_event_id ON buzz_frames (event_id);
+CREATE INDEX IF NOT EXISTS buzz_frames_filename ON buzz_frames (filename);
+
+CREATE TABLE IF NOT EXISTS report_files (
+    name TEXT PRIMARY KEY,  -- File name in REPORT_DATA_DIR
+    category TEXT NOT NULL,  -- detection, test_case, buzz_frame or other
+    size INTEGER NOT NULL,  -- Bytes
+    created REAL NOT NULL  -- time.time()
+);
+CREATE INDEX IF NOT EXISTS report_files_category_created ON report_files (category, created);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,  -- JSON body for the API
+    created REAL NOT NULL,  -- time.time()
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,  -- time.time() of the next try
+    last_error TEXT,
+    failed INTEGER NOT NULL DEFAULT 0  -- 1 once the server rejected it; kept for inspection, not retried
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (failed, next_attempt);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,  -- One-time data migration that has been applied
+    applied REAL NOT NULL  -- time.time()
+);
+"""
+
+# Columns added after their table was first created: (table, column, type)
+ADDED_COLUMNS = [
+    ("buzz_events", "timings", "TEXT")
+]
+
+# Report files written before the store, next to it in the report folder: (file name, kind).
+# tests.json/buzzers.json are the original JSON arrays, the .jsonl files the logs that briefly replaced them.
+LEGACY_REPORTS = [
+    ("tests.json", "tests"),
+    ("tests.jsonl", "tests"),
+    ("buzzers.json", "buzzers"),
+    ("buzzers.jsonl", "buzzers")
+]
+
+class Store:
+    """
+    Local SQLite store for visits, test cases, buzz events, the index of report images and the API outbox.
+    Runs in WAL mode so the app can keep writing while photo_reviewer.py reads, and gives every
+    thread its own connection. List queries are newest first and paginated by id, so they only
+    touch the rows they return no matter how much history has built up.
+    """
+    def __init__(self, path=STORE_PATH):
+        self.path = str(path)
+        self.local = threading.local()  # Per-thread connection
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+
+    def connection(self):
+        conn = getattr(self.local, "connection", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; only the last commits can be lost on power loss
+            conn.execute("PRAGMA foreign_keys=ON")
+            with self.schema_lock:
+                if not self.schema_ready:
+                    conn.executescript(SCHEMA)
+                    add_missing_columns(conn)
+                    self.migrate_legacy_reports(conn)
+                    self.schema_ready = True
+            self.local.connection = conn
+        return conn
+
+    def migrate_legacy_reports(self, conn):
+        """
+        Imports test cases and buzz events from the report files the store replaced, once.
+        The import and its entry in `migrations` commit together, so running it again (or in
+        another process at the same time) never duplicates anything. The old files are left in place.
+        """
+        folder = os.path.dirname(self.path) or "."
+        with conn:
+            # Takes the write lock, so a second process waits here and then finds the marker
+            if conn.execute("INSERT OR IGNORE INTO migrations (name, applied) VALUES ('legacy_reports', ?)", (time.time(),)).rowcount == 0:
+                return
+
+            seen = set()  # The .jsonl logs could start with an import of the .json file
+            counts = {"tests": 0, "buzzers": 0}
+            for name, kind in LEGACY_REPORTS:
+                for entry in read_legacy_report(os.path.join(folder, name)):
+                    try:
+                        if kind == "tests":
+                            key = ("tests", entry["timestamp"], entry["file_path"])
+                            if key in seen:
+                                continue
+                            conn.execute(
+                                "INSERT INTO test_cases (timestamp, file_path, dog, confidence_values, triggered_tests, copied_to) VALUES (?, ?, ?, ?, ?, ?)",
+                                (entry["timestamp"], entry["file_path"], entry.get("dog"), json.dumps(entry["confidence_values"]),
+                                 json.dumps(entry["triggered_tests"]), entry.get("copied_to"))
+                            )
+                        else:
+                            key = ("buzzers", entry["start_time"])
+                            if key in seen:
+                                continue
+                            event_id = conn.execute(
+                                "INSERT INTO buzz_events (start_time, end_time) VALUES (?, ?)", (entry["start_time"], entry.get("end_time"))
+                            ).lastrowid
+                            conn.executemany(
+                                "INSERT INTO buzz_frames (event_id, filename, confidence_values) VALUES (?, ?, ?)",
+                                [(event_id, frame["filename"], json.dumps(frame["confidence_values"])) for frame in entry.get("frames", [])]
+                            )
+                    except (KeyError, TypeError):
+                        logger.warning(f"Store: skipping a malformed entry in {name}.")
+                        continue
+                    seen.add(key)
+                    counts[kind] += 1
+
+        if counts["tests"] or counts["buzzers"]:
+            logger.info(f"Store: imported {counts['tests']} test cases and {counts['buzzers']} buzz events from the old report files in {folder}.")
+
+    def close(self):
+        """
+        Closes the calling thread's connection.
+        """
+        conn = getattr(self.local, "connection", None)
+        if conn is not None:
+            conn.close()
+            self.local.connection = None
+
+    # Visits
+
+    def add_visit(self, dog, start_time, end_time):
+        with self.connection() as conn:
+            return conn.execute(
+                "INSERT INTO visits (dog, start_time, end_time) VALUES (?, ?, ?)",
+                (dog, start_time.isoformat(), end_time.isoformat())
+            ).lastrowid
+
+    def visits(self, since=None, until=None, dog=None, limit=50, before_id=None):
+        """
+        Returns visits that started in [since, until), newest first.
+        """
+        query, params = "SELECT * FROM visits WHERE 1", []
+        if since is not None:
+            query += " AND start_time >= ?"
+            params.append(since.isoformat())
+        if until is not None:
+            query += " AND start_time < ?"
+            params.append(until.isoformat())
+        if dog is not None:
+            query += " AND dog = ?"
+            params.append(dog)
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY start_time DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self.connection().execute(query, params)]
+
+    # Test cases
+
+    def add_test_case(self, file_path, timestamp, confidence_values, triggered_tests, dog, copied_to=None):
+        with self.connection() as conn:
+            return conn.execute(
+                "INSERT INTO test_cases (timestamp, file_path, dog, confidence_values, triggered_tests, copied_to) VALUES (?, ?, ?, ?, ?, ?)",
+                (timestamp, file_path, dog, json.dumps(confidence_values), json.dumps(triggered_tests), copied_to)
+            ).lastrowid
+
+    def test_cases(self, limit=50, before_id=None):
+        """
+        Returns up to `limit` test cases older than `before_id`, newest first.
+        """
+        if before_id is None:
+            rows = self.connection().execute("SELECT * FROM test_cases ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            rows = self.connection().execute("SELECT * FROM test_cases WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit))
+        return [test_case_from_row(row) for row in rows]
+
+    def count_test_cases(self):
+        return self.connection().execute("SELECT COUNT(*) FROM test_cases").fetchone()[0]
+
+    def find_test_case(self, file_name):
+        """
+        Returns the newest test case saved as `file_name`, or None.
+        """
+        row = self.connection().execute(
+            "SELECT * FROM test_cases WHERE file_path = ? ORDER BY id DESC LIMIT 1", (file_name,)
+        ).fetchone()
+        return test_case_from_row(row) if row else None
+
+    def mark_test_case_copied(self, test_case_id, copied_to):
+        with self.connection() as conn:
+            conn.execute("UPDATE test_cases SET copied_to = ? WHERE id = ?", (copied_to, test_case_id))
+
+    # Buzz events
+
+    def start_buzz_event(self, start_time, timings=None):
+        with self.connection() as conn:
+            return conn.execute(
+                "INSERT INTO buzz_events (start_time, timings) VALUES (?, ?)",
+                (start_time, json.dumps(timings) if timings else None)
+            ).lastrowid
+
+    def update_buzz_timings(self, event_id, timings):
+        with self.connection() as conn:
+            conn.execute("UPDATE buzz_events SET timings = ? WHERE id = ?", (json.dumps(timings), event_id))
+
+    def end_buzz_event(self, event_id, end_time):
+        with self.connection() as conn:
+            conn.execute("UPDATE buzz_events SET end_time = ? WHERE id = ?", (end_time, event_id))
+
+    def add_buzz_frame(self, event_id, filename, confidence_values):
+        with self.connection() as conn:
+            return conn.execute(
+                "INSERT INTO buzz_frames (event_id, filename, confidence_values) VALUES (?, ?, ?)",
+                (event_id, filename, json.dumps(confidence_values))
+            ).lastrowid
+
+    def buzz_events(self, limit=50, before_id=None):
+        """
+        Returns up to `limit` buzz events older than `before_id` with their frames, newest first.
+        """
+        conn = self.connection()
+        if before_id is None:
+            rows = conn.execute("SELECT * FROM buzz_events ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            rows = conn.execute("SELECT * FROM buzz_events WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit))
+        events = [dict(row, frames=[], timings=json.loads(row["timings"]) if row["timings"] else None) for row in rows]
+        if events:
+            by_id = {event["id"]: event for event in events}
+            placeholders = ",".join("?" * len(by_id))
+            for row in conn.execute(f"SELECT * FROM buzz_frames WHERE event_id IN ({placeholders}) ORDER BY id", list(by_id)):
+                by_id[row["event_id"]]["frames"].append({
+                    "filename": row["filename"],
+                    "confidence_values": json.loads(row["confidence_values"])
+                })
+        return events
+
+    def buzz_timings(self, since=None):
+        """
+        Returns (start_time, timings) for buzz events with recorded timings that started at or after `since`, oldest first.
+        """
+        query, params = "SELECT start_time, timings FROM buzz_events WHERE timings IS NOT NULL", []
+        if since is not None:
+            query += " AND start_time >= ?"
+            params.append(since.isoformat())
+        query += " ORDER BY start_time"
+        return [(row["start_time"], json.loads(row["timings"])) for row in self.connection().execute(query, params)]
+
+    # Report file index (for retention)
+
+    def track_report_files(self, files):
+        """
+        Adds or updates (name, category, size, created) entries in the report file index.
+        """
+        with self.connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO report_files (name, category, size, created) VALUES (?, ?, ?, ?)", files)
+
+    def track_report_file(self, name, category, size, created):
+        """
+        Adds or replaces one entry in the report file index.
+        Returns the (category, size) of the entry it replaced, or None if the name is new.
+        """
+        with self.connection() as conn:
+            row = conn.execute("SELECT category, size FROM report_files WHERE name = ?", (name,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO report_files (name, category, size, created) VALUES (?, ?, ?, ?)", (name, category, size, created))
+        return (row[0], row[1]) if row else None
+
+    def untrack_report_files(self, names):
+        with self.connection() as conn:
+            conn.executemany("DELETE FROM report_files WHERE name = ?", [(name,) for name in names])
+
+    def report_file_usage(self):
+        """
+        Returns {category: (file count, total bytes)} for the report file index.
+        """
+        rows = self.connection().execute("SELECT category, COUNT(*), COALESCE(SUM(size), 0) FROM report_files GROUP BY category")
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def evictable_report_files(self, category, older_than=None, limit=50):
+        """
+        Returns up to `limit` (name, size) of the oldest files in `category` that no test case or
+        buzz event refers to, optionally only those created before `older_than` (time.time()).
+        """
+        query = """
+            SELECT name, size FROM report_files f
+            WHERE category = ? AND created < ?
+            AND NOT EXISTS (SELECT 1 FROM test_cases t WHERE t.file_path = f.name)
+            AND NOT EXISTS (SELECT 1 FROM buzz_frames b WHERE b.filename = f.name)
+            ORDER BY created LIMIT ?
+        """
+        rows = self.connection().execute(query, (category, older_than if older_than is not None else float("inf"), limit))
+        return [(row[0], row[1]) for row in rows]
+
+    # One-time jobs
+
+    def migration_applied(self, name):
+        return self.connection().execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone() is not None
+
+    def mark_migration_applied(self, name):
+        with self.connection() as conn:
+            conn.execute("INSERT OR IGNORE INTO migrations (name, applied) VALUES (?, ?)", (name, time.time()))
+
+    # Outbox of API uploads
+
+    def add_to_outbox(self, payload):
+        now = time.time()
+        with self.connection() as conn:
+            return conn.execute(
+                "INSERT INTO outbox (payload, created, next_attempt) VALUES (?, ?, ?)", (json.dumps(payload), now, now)
+            ).lastrowid
+
+    def due_outbox(self, limit):
+        """
+        Returns up to `limit` (id, payload, attempts) outbox entries due for a try, oldest first.
+        """
+        rows = self.connection().execute(
+            "SELECT id, payload, attempts FROM outbox WHERE failed = 0 AND next_attempt <= ? ORDER BY id LIMIT ?", (time.time(), limit)
+        )
+        return [(row[0], json.loads(row[1]), row[2]) for row in rows]
+
+    def next_outbox_attempt(self):
+        """
+        Returns when the next pending outbox entry is due (time.time()), or None if there is none.
+        """
+        return self.connection().execute("SELECT MIN(next_attempt) FROM outbox WHERE failed = 0").fetchone()[0]
+
+    def remove_from_outbox(self, ids):
+        with self.connection() as conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def retry_outbox_later(self, ids, next_attempt, error):
+        with self.connection() as conn:
+            conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt = ?, last_error = ? WHERE id = ?",
+                [(next_attempt, error, i) for i in ids]
+            )
+
+    def fail_outbox(self, ids, error):
+        with self.connection() as conn:
+            conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, failed = 1, last_error = ? WHERE id = ?", [(error, i) for i in ids]
+            )
+
+    def outbox_stats(self):
+        row = self.connection().execute(
+            "SELECT COALESCE(SUM(failed = 0), 0), COALESCE(SUM(failed), 0), MIN(CASE WHEN failed = 0 THEN created END) FROM outbox"
+        ).fetchone()
+        return {
+            "pending": row[0],
+            "failed": row[1],
+            "oldest_pending_age_s": round(time.time() - row[2], 1) if row[2] else None
+        }
+
+def add_missing_columns(conn):
+    """
+    Adds ADDED_COLUMNS to tables in stores created before those columns existed.
+    """
+    for table, column, column_type in ADDED_COLUMNS:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            logger.info(f"Store: added column {table}.{column}.")
+
+def read_legacy_report(path):
+    """
+    Returns the entries of an old report file: a JSON array (.json) or one JSON object per line (.jsonl).
+    A missing file, and the {} old files were seeded with, have none; unreadable lines are skipped.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        if not path.endswith(".jsonl"):
+            try:
+                data = json.load(f)
+            except ValueError:
+                logger.warning(f"Store: could not read {path}, not importing it.")
+                return []
+            return data if isinstance(data, list) else []
+
+        entries = []
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # Blank, or torn by a crash in the middle of an append
+        return entries
+
+def test_case_from_row(row):
+    test_case = dict(row)
+    test_case["confidence_values"] = json.loads(test_case["confidence_values"])
+    test_case["triggered_tests"] = json.loads(test_case["triggered_tests"])
+    return test_case
+
+store = Store()  # Shared instance
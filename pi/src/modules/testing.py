@@ -1,28 +1,26 @@
-from modules.utils import json_exists
-from config import TESTS_JSON_PATH, REPORT_DATA_DIR, BUZZERS_JSON_PATH
-import cv2
+from modules.store import store
+from modules.image_writer import image_writer
+from config import REPORT_DATA_DIR
+from modules.utils import repo_root
+from modules.clock import clock
+from modules.metrics import metrics
+from modules.simulated_camera import simulated_camera
 import os
+import numpy as np
 from modules.logger import logger
-import json
 from config import SWITCH_DETECTION_TIME, LOW_CONFIDENCE_THRESHOLD, SECOND_THIRD_CONFIDENCE_THRESHOLD
 from modules.state import app_state
-import datetime
-from pathlib import Path
-
-# Ensure the required directories and files exist
-json_exists(TESTS_JSON_PATH)
-json_exists(BUZZERS_JSON_PATH)
 
 def save_test_case(frame, triggered_tests, confidence_values, timestamp, dog):
     """
-    Saves the frame as an image, updates the JSON file, and logs the event.
+    Saves the frame as an image, records the test case in the store, and logs the event.
     """
     # Generate filename and file path
     filename = f"TestCase_{timestamp}.jpg"
-    filepath = os.path.join(REPORT_DATA_DIR, filename)
+    filepath = os.path.join(repo_root, REPORT_DATA_DIR, filename)
 
-    # Save the frame
-    cv2.imwrite(filepath, frame)
+    # Save the frame in the background
+    image_writer.write(frame, filepath)
 
     # Prepare metadata
     test_data = {
@@ -33,12 +31,8 @@ def save_test_case(frame, triggered_tests, confidence_values, timestamp, dog):
         "dog": dog
     }
 
-    # Append the data to the JSON report
-    with open(TESTS_JSON_PATH, "r+") as f:
-        data = json.load(f)
-        data.append(test_data)
-        f.seek(0)
-        json.dump(data, f, indent=4)
+    # Record the test case
+    store.add_test_case(**test_data)
 
     logger.info(f"Test case triggered. Saved to {filepath} with details: {test_data}")
 
@@ -67,40 +61,140 @@ def test3_mixed_confidence(dog, confidence_values):
         return ["High confidence for 2nd/3rd class."]
     return []
 
-def start_buzz_event():
+def start_buzz_event(actuation, actuation_result):
     """
-    Starts a new buzz event for Nova.
+    Starts a new buzz event for Nova, with the stage timestamps of the detection that triggered it
+    (motion onset, Nova's onset, capture, inference start and end, decision) and of the actuation:
+    when the vibration GPIO was driven (`actuation`, clock.time()) and whether the bowl vibrated
+    (`actuation_result`, see vibration.set_vibration). gpio_high is only set for a buzz that vibrated.
+    Called once the GPIO has been driven, so the store write doesn't delay the bowl.
     """
-    app_state.current_buzz_event
-    now = datetime.datetime.now()
+    now = clock.now()
+    timings = dict(
+        app_state.detection_timings or {},
+        actuation=actuation,
+        actuation_result=actuation_result,
+        gpio_high=actuation if actuation_result == "vibrated" else None
+    )
 
     app_state.current_buzz_event = {
+        "id": store.start_buzz_event(now.isoformat(), timings),
         "start_time": now.isoformat(),
         "end_time": None,
+        "timings": timings,
         "frames": []
     }
-    logger.info(f"Started new buzz event at {now}.")
+    logger.info(f"Started new buzz event at {now} ({actuation_result}).")
+    if timings.get("onset") is not None:
+        metrics.observe("motion_to_actuation", actuation - timings["onset"])
+    if timings["gpio_high"] is not None:
+        observe_motion_to_buzz(timings)
+
+def record_buzz_gpio_high(gpio_high):
+    """
+    Records when the current buzz event first drove the vibration GPIO HIGH (clock.time()), if it didn't
+    when it started (e.g. the safety buffer was active), completing its motion-to-buzz latency.
+    """
+    event = app_state.current_buzz_event
+    if not event or event["timings"]["gpio_high"] is not None:
+        return
+
+    timings = event["timings"]
+    timings["gpio_high"] = gpio_high
+    store.update_buzz_timings(event["id"], timings)
+    observe_motion_to_buzz(timings)
+
+def observe_motion_to_buzz(timings):
+    if timings.get("onset") is not None:
+        latency = timings["gpio_high"] - timings["onset"]
+        metrics.observe("motion_to_buzz", latency)
+        logger.info(f"Motion to buzz: {latency * 1000:.0f} ms.")
 
 def end_buzz_event():
     """
-    Ends the current buzz event and writes it to buzzers.json.
+    Ends the current buzz event and records its end time in the store.
     """
     if not app_state.current_buzz_event:
         return
 
-    now = datetime.datetime.now()
+    now = clock.now()
     app_state.current_buzz_event["end_time"] = now.isoformat()
     logger.info(f"Ended buzz event at {now}.")
 
-    # Write the event to buzzers.json
-    with open(BUZZERS_JSON_PATH, "r+") as f:
-        data = json.load(f)
-        data.append(app_state.current_buzz_event)
-        f.seek(0)
-        json.dump(data, f, indent=4)
+    store.end_buzz_event(app_state.current_buzz_event["id"], app_state.current_buzz_event["end_time"])
 
     app_state.current_buzz_event = None  # Reset the current event
 
+# Motion-to-buzz latency broken into stages: (name, from timestamp, to timestamp).
+# "onset" is the motion onset, or the last frame classified as something else if another dog
+# was in the bowl since, so the latencies are upper bounds at frame granularity.
+# "actuation" is recorded for every buzz event, "gpio_high" only once the bowl actually vibrated,
+# so motion_to_actuation covers buzzes suppressed by the safety buffer, ENABLE_VIBRATION or a missing GPIO.
+LATENCY_STAGES = [
+    ("onset_to_capture", "onset", "capture"),  # Frames seen before the one that triggered the buzz
+    ("queued", "capture", "inference_start"),  # Waiting for motion scoring and an interpreter
+    ("inference", "inference_start", "inference_end"),
+    ("decision", "inference_end", "decision"),
+    ("actuation", "decision", "actuation"),
+    ("motion_to_decision", "onset", "decision"),
+    ("motion_to_actuation", "onset", "actuation"),
+    ("motion_to_buzz", "onset", "gpio_high")
+]
+DAILY_STAGES = ["motion_to_decision", "motion_to_actuation", "motion_to_buzz"]  # End-to-end latencies trended per day
+
+def latency_summary(values):
+    values = np.array(values) * 1000
+    return {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)), 1) if len(values) else None,
+        "p95_ms": round(float(np.percentile(values, 95)), 1) if len(values) else None,
+        "max_ms": round(float(values.max()), 1) if len(values) else None
+    }
+
+def actuation_result(timings):
+    """
+    Whether the buzz vibrated the bowl, or why not. Events recorded before actuations were tracked
+    only have gpio_high.
+    """
+    if timings.get("actuation_result"):
+        return timings["actuation_result"]
+    return "vibrated" if timings.get("gpio_high") is not None else "not_recorded"
+
+def buzz_latency_report(since=None):
+    """
+    Reports the recorded stage latencies of buzz events started since `since`, oldest first:
+    one row per event, the end-to-end latencies per day (the trend), and each stage's distribution overall.
+    """
+    stages = {name: [] for name, _, _ in LATENCY_STAGES}
+    daily = {}  # date -> {"events": count, "results": {result: count}, stage: [latencies]}
+    events = []
+    for start_time, timings in store.buzz_timings(since):
+        result = actuation_result(timings)
+        day = daily.setdefault(start_time[:10], dict({"events": 0, "results": {}}, **{name: [] for name in DAILY_STAGES}))
+        day["events"] += 1
+        day["results"][result] = day["results"].get(result, 0) + 1
+
+        event = {"start_time": start_time, "actuation_result": result}
+        for name, begin, end in LATENCY_STAGES:
+            if timings.get(begin) is None or timings.get(end) is None:
+                event[f"{name}_ms"] = None
+                continue
+            latency = timings[end] - timings[begin]
+            event[f"{name}_ms"] = round(latency * 1000, 1)
+            stages[name].append(latency)
+            if name in day:
+                day[name].append(latency)
+        events.append(event)
+
+    return {
+        "events": events,
+        "daily": [
+            dict({name: latency_summary(day[name]) for name in DAILY_STAGES}, date=date, events=day["events"], results=day["results"])
+            for date, day in sorted(daily.items())
+        ],
+        "stages": {name: latency_summary(values) for name, values in stages.items()}
+    }
+
 def add_frame_to_buzz_event(frame, confidence_values):
     """
     Adds frame data to the current buzz event.
@@ -109,58 +203,29 @@ def add_frame_to_buzz_event(frame, confidence_values):
         return
 
     # Generate a unique filename for the frame
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    timestamp = clock.now().strftime("%Y%m%d%H%M%S")
     filename = f"BuzzFrame_{timestamp}.jpg"
-    filepath = os.path.join(REPORT_DATA_DIR, filename)
+    filepath = os.path.join(repo_root, REPORT_DATA_DIR, filename)
 
-    # Save the frame
-    cv2.imwrite(filepath, frame)
+    # Save the frame in the background
+    image_writer.write(frame, filepath)
 
     # Append frame data to the event
-    app_state.current_buzz_event["frames"].append({
+    frame_data = {
         "filename": filename,
         "confidence_values": {
             "Mila" : confidence_values.get("Mila", 0.0),
             "Nova" : confidence_values.get("Nova", 0.0),
             "None" : confidence_values.get("None", 0.0)
         }
-    })
-
-def load_test_images(directory):
-    """
-    Loads all images from the specified directory in sorted order.
-    """
-    image_paths = sorted(Path(directory).glob("*.jpg"))
-    return [cv2.imread(str(image_path)) for image_path in image_paths if cv2.imread(str(image_path)) is not None]
+    }
+    app_state.current_buzz_event["frames"].append(frame_data)
+    store.add_buzz_frame(app_state.current_buzz_event["id"], **frame_data)
 
 # Updates the dummy images that get fed in lieu of actual captured frames
 def update_simulated_images(directory):
     """
-    Updates the active images list based on the specified directory.
-    Resets the current image index to 0.
+    Switches the simulated camera to the images in the specified directory, starting from the first one.
     """
-
+    simulated_camera.open(directory)  # Only lists the files; frames are decoded as they're needed
     app_state.use_dummy_images = True
-
-    # Load all images from the directory
-    app_state.active_images = load_test_images(directory)
-    if not app_state.active_images:
-        raise ValueError(f"No valid images found in directory: {directory}")
-
-    # Reset the image index
-    current_image_index = 0
-    logger.info(f"Updated simulated images from directory: {directory}")
-
-# Gets next dummy image in the queue
-def get_simulated_image():
-    """
-    Returns the next image in the active images list.
-    Cycles back to the first image after reaching the end of the list.
-    """
-    if not app_state.active_images:
-        raise ValueError("No active images loaded. Call update_simulated_images() first.")
-
-    # Get the current image and increment the index
-    image = app_state.active_images[app_state.current_image_index]
-    app_state.current_image_index = (app_state.current_image_index + 1) % len(app_state.active_images)  # Cycle back to the start
-    return image
@@ -15,10 +15,4 @@ repo_root = find_repo_root(__file__)
 # Ensure report directories and files exist
 def folder_exists(folder_path):
     if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-
-# Ensure JSON files exist
-def json_exists(json_path):
-    if not os.path.exists(json_path):
-        with open(json_path, "w") as file:
-            file.write("{}")
\ No newline at end of file
+        os.makedirs(folder_path)
\ No newline at end of file
@@ -1,7 +1,8 @@
 from config import VIBRATE_GPIO_PIN, ENABLE_VIBRATION
-from modules.testing import start_buzz_event, end_buzz_event
+from modules.testing import start_buzz_event, end_buzz_event, record_buzz_gpio_high
 from modules.state import app_state
 from modules.logger import logger
+from modules.clock import clock
 
 # Initialize the GPIO library
 try:
@@ -19,34 +20,45 @@ except ImportError:
 # Vibrate bowl based on detection
 def control_vibration(position):
 
+    # Main evaluation first, so recording the buzz event never delays the bowl
+    result = set_vibration(position)
+    actuated = clock.time()  # Where the bowl was (or would have been) driven, even if it didn't vibrate
+
     # For buzz reporting only
     if position == "on":
         if not app_state.current_buzz_event:
-            start_buzz_event()
+            start_buzz_event(actuated, result)
+        elif result == "vibrated":
+            record_buzz_gpio_high(actuated)
     else:
         if app_state.current_buzz_event:
             end_buzz_event()
-    
-    # Main evaluation
+
+def set_vibration(position):
+    """
+    Drives the vibration GPIO. For "on", returns "vibrated" once the GPIO is HIGH, or why it wasn't
+    driven: "no_gpio", "safety_buffer" or "disabled" (ENABLE_VIBRATION is off). Returns None for "off".
+    """
     if app_state.gpio is None:
         logger.info("GPIO functionality is disabled. No vibration control.")
-        return
+        return "no_gpio" if position == "on" else None
 
     if position == "on":
         if app_state.safety_buffer_active:
             # Suppress vibration if safety buffer is active
             logger.info("Safety buffer is active. Vibration suppressed.")
-            return
+            return "safety_buffer"
         if not ENABLE_VIBRATION:
             # Override to disable vibration
             logger.info("Vibration is disabled by override.")
-            return
+            return "disabled"
 
         # Activate vibration
         app_state.gpio.output(VIBRATE_GPIO_PIN, app_state.gpio.HIGH)
         logger.info("Vibration activated for Nova.")
+        return "vibrated"
     else:
         if app_state.gpio.input(VIBRATE_GPIO_PIN):
             logger.info("Vibration deactivated.")
         app_state.gpio.output(VIBRATE_GPIO_PIN, app_state.gpio.LOW)
-        
+        return None
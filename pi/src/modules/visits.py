@@ -3,13 +3,15 @@ from modules.vibration import control_vibration
 from modules.api import send_visit_to_api
 from config import SAFETY_BUFFER
 from modules.logger import logger
-import datetime
+from modules.inference_cache import inference_cache
+from modules.store import store
+from modules.clock import clock
 
 def register_detection(dog):
     """
     Handles the registration of visits based on the detection of Mila or Nova.
     """
-    now = datetime.datetime.now()
+    now = clock.now()
 
     if dog == "Mila":
         # Record Mila's detection and disable vibration
@@ -38,7 +40,7 @@ def update_visit(dog):
     Updates the current visit with the current end time.
     """
     if (dog) == app_state.current_visit["dog"]:
-        app_state.current_visit["end_time"] = datetime.datetime.now()
+        app_state.current_visit["end_time"] = clock.now()
     else:
         finalize_visit()
         new_visit(dog)
@@ -48,17 +50,29 @@ def new_visit(dog):
     Starts a new visit for the specified dog.
     """
     app_state.current_visit["dog"] = dog
-    app_state.current_visit["start_time"] = datetime.datetime.now()
-    app_state.current_visit["end_time"] = datetime.datetime.now()
+    app_state.current_visit["start_time"] = clock.now()
+    app_state.current_visit["end_time"] = clock.now()
+    app_state.visit_cache_start = inference_cache.stats()  # To report invocations saved during the visit
     logger.info(f"Starting new visit for {dog}.")
 
 def finalize_visit():
     """
-    Finalizes the current visit and sends data to the API.
+    Finalizes the current visit, records it in the store and sends data to the API.
     """
     logger.info(f"{app_state.current_visit['dog']}'s visit complete. Dog: {app_state.current_visit['dog']}, Start: {app_state.current_visit['start_time']}, End: {app_state.current_visit['end_time']}")
 
     if app_state.current_visit["dog"] is not None:
+        cache_stats = inference_cache.stats()
+        hits = cache_stats["hits"] - app_state.visit_cache_start["hits"]
+        misses = cache_stats["misses"] - app_state.visit_cache_start["misses"]
+        logger.info(f"Inference cache saved {hits} of {hits + misses} invocations during the visit.")
+
+        store.add_visit(
+            app_state.current_visit["dog"],
+            app_state.current_visit["start_time"],
+            app_state.current_visit["end_time"]
+        )
+
         send_visit_to_api(
             app_state.current_visit["dog"],
             app_state.current_visit["start_time"],
@@ -3,8 +3,9 @@ import os
 from pathlib import Path
 from datetime import datetime, timedelta
 import pytz  # Import pytz for time zone handling
-import json
 import shutil  # For copying files
+from config import TEST_CASES_PAGE_SIZE
+from modules.store import store
 
 # Determine the absolute path to the shared folder
 def find_repo_root(start_path):
@@ -22,7 +23,6 @@ untagged_dir = photos_dir / "untagged"
 mila_dir = photos_dir / "Mila"
 nova_dir = photos_dir / "Nova"
 none_dir = photos_dir / "None"  # New "None" category
-test_cases_json = Path("report/tests.json")  # Path to the tests.json file
 
 # Ensure directories exist
 for directory in [untagged_dir, mila_dir, nova_dir, none_dir, report_dir]:
@@ -52,7 +52,7 @@ def index():
         "Nova": nova_dir,
         "None": none_dir,
         "untagged": untagged_dir,
-        "test_cases": test_cases_json
+        "test_cases": None  # Counted in the store
     }
 
     dog_folders = {}
@@ -60,12 +60,9 @@ def index():
 
     for category, folder in categories.items():
         if category == "test_cases":
-            # Count JSON entries
-            if test_cases_json.exists():
-                with open(test_cases_json, "r") as f:
-                    data = json.load(f)
-                dog_folders[category] = len(data)
-                dog_previews[category] = data[0]["file_path"] if data else None
+            latest = store.test_cases(limit=1)
+            dog_folders[category] = store.count_test_cases()
+            dog_previews[category] = latest[0]["file_path"] if latest else None
         else:
             photos = [f for f in os.listdir(folder) if f.endswith(".jpg")]
             dog_folders[category] = len(photos)
@@ -75,14 +72,21 @@ def index():
 
 @app.route("/test_cases")
 def test_cases():
-    # Load test cases from JSON
-    if not test_cases_json.exists():
+    # Newest test cases first, one page at a time (?before=<id> for older ones)
+    before = request.args.get("before", type=int)
+    entries = store.test_cases(limit=TEST_CASES_PAGE_SIZE + 1, before_id=before)
+    if not entries and before is None:
         return "No test cases found.", 404
 
-    with open(test_cases_json, "r") as f:
-        data = json.load(f)
+    older = entries[TEST_CASES_PAGE_SIZE - 1]["id"] if len(entries) > TEST_CASES_PAGE_SIZE else None
+    entries = list(with_display_times(entries[:TEST_CASES_PAGE_SIZE]))
+    return render_template("test_cases.html", test_cases=entries, older=older)
 
-    for entry in data:
+def with_display_times(entries):
+    """
+    Adds absolute and relative display times to each test case.
+    """
+    for entry in entries:
         parsed_time = datetime.strptime(entry["timestamp"], "%Y%m%d%H%M%S")
         
         # Format as absolute time (e.g., "December 29, 2024, 19:34:23")
@@ -104,12 +108,9 @@ def test_cases():
             else:
                 relative_time = "just now"
 
-        entry["absolute_time"] = absolute_time,
+        entry["absolute_time"] = absolute_time
         entry["relative_time"] = relative_time
-
-        print(entry)
-
-    return render_template("test_cases.html", test_cases=data)
+        yield entry
 
 @app.route("/copy_to/<photo>/<label>")
 def copy_photo(photo, label):
@@ -118,28 +119,21 @@ def copy_photo(photo, label):
     if label not in valid_categories:
         return "Invalid label.", 404
 
-    # Locate the photo from tests.json
-    with open(test_cases_json, "r+") as f:
-        data = json.load(f)
-        photo_entry = next((entry for entry in data if entry["file_path"].endswith(photo)), None)
-
-        if not photo_entry:
-            return "Photo not found in test cases.", 404
+    # Locate the photo in the test cases
+    photo_entry = store.find_test_case(photo)
 
-        # Copy the photo to the target directory
-        src_path = Path(photo_entry["file_path"])
-        dest_dir = valid_categories[label]
-        dest_path = dest_dir / src_path.name
+    if not photo_entry:
+        return "Photo not found in test cases.", 404
 
-        shutil.copy(src_path, dest_path)
+    # Copy the photo to the target directory
+    src_path = report_dir / Path(photo_entry["file_path"]).name
+    dest_dir = valid_categories[label]
+    dest_path = dest_dir / src_path.name
 
-        # Append copy details to the JSON entry
-        photo_entry["copied_to"] = str(dest_path)
+    shutil.copy(src_path, dest_path)
 
-        # Update the JSON file
-        f.seek(0)
-        json.dump(data, f, indent=4)
-        f.truncate()
+    # Record where the photo was copied
+    store.mark_test_case_copied(photo_entry["id"], str(dest_path))
 
     return redirect(url_for("test_cases"))
 
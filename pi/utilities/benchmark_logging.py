@@ -0,0 +1,77 @@
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import cv2
+
+# Run from pi/src so config paths (model, logs, report) resolve like they do for main.py
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+os.chdir(SRC_DIR)
+sys.path.insert(0, str(SRC_DIR))
+
+from modules.logger import logger, file_and_console_handlers, queue_logging
+from modules.image_processing import detect_motion
+
+# Configuration
+TEST_FOLDER = "test-photos/test-set-2"  # Frames to benchmark with (relative to pi/src)
+ROUNDS = 5  # Passes over the folder for each logging setup
+
+def hot_loop(frames):
+    """
+    The per-frame work of the motion stage plus the messages logged on every frame
+    (motion detected, and vibration control without GPIO). Returns per-frame times in seconds.
+    """
+    times = []
+    for _ in range(ROUNDS):
+        for frame in frames:
+            start = time.perf_counter()
+            motion = detect_motion(frame)
+            logger.debug(f"Motion detected (score {motion.score:.3f}, box {motion.bbox}). Evaluating frame...")
+            logger.info("GPIO functionality is disabled. No vibration control.")
+            times.append(time.perf_counter() - start)
+    return times
+
+def set_handlers(handlers):
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    for handler in handlers:
+        logger.addHandler(handler)
+
+def main():
+    frames = [cv2.imread(str(path)) for path in sorted(Path(TEST_FOLDER).glob("*.jpg"))]
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        print(f"No frames found in {TEST_FOLDER}")
+        return
+
+    log_dir = Path(tempfile.mkdtemp())
+    devnull = open(os.devnull, "w")  # Console output is discarded so the terminal doesn't skew timings
+    results = {}
+
+    # Logging off (each setup replaces the app's own handlers with its own)
+    set_handlers([])
+    logger.disabled = True
+    results["off"] = hot_loop(frames)
+    logger.disabled = False
+
+    # The old setup: file and console handlers called synchronously on the frame loop
+    set_handlers(file_and_console_handlers(log_dir / "sync.log", stream=devnull))
+    results["synchronous"] = hot_loop(frames)
+
+    # The app's setup: queue handler with rate limiting, writing on a listener thread
+    set_handlers([])
+    queued_listener = queue_logging(logger, file_and_console_handlers(log_dir / "queued.log", stream=devnull))
+    results["queued + rate limited"] = hot_loop(frames)
+    queued_listener.stop()
+
+    print(f"{len(frames)} frames x {ROUNDS} rounds")
+    print(f"{'logging':<24}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, times in results.items():
+        ms = np.array(times) * 1000
+        print(f"{name:<24}{ms.mean():>10.3f}{np.percentile(ms, 95):>10.3f}{ms.max():>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import cv2
+
+# Run from pi/src so config paths (model, logs, report) resolve like they do for main.py
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+CALLER_DIR = Path.cwd()  # Output files and --models paths are relative to where the command was run
+os.chdir(SRC_DIR)
+sys.path.insert(0, str(SRC_DIR))
+
+from config import CLASS_LABELS, MODEL_DIR, INTERPRETER_USE_XNNPACK, INTERPRETER_DELEGATES
+from modules.utils import repo_root
+
+# Configuration
+MODEL_DIRS = [SRC_DIR / MODEL_DIR, repo_root / "ml" / "tm_dog_model"]  # Every shipped .tflite in these is benchmarked
+THREADS = "1,2,4"  # Interpreter thread counts to try with each model
+FRAMES_FOLDER = "test-photos/test-set-2"  # Camera frames used for latency (relative to pi/src)
+LABELED_FOLDER = repo_root / "static" / "training_photos"  # Mila/, Nova/ and None/ subfolders used for accuracy
+ROUNDS = 3  # Passes over the frames for steady-state latency
+WORKER_TIMEOUT = 900  # Seconds before a single model/thread run is abandoned
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+
+def load_images(paths):
+    images = [(path, cv2.imread(str(path))) for path in paths]
+    return [(path, image) for path, image in images if image is not None]
+
+def labeled_images(folder):
+    """
+    Returns (label, image) for every readable image in the folder's class subfolders.
+    """
+    images = []
+    for label in CLASS_LABELS:
+        paths = sorted(p for p in (Path(folder) / label).glob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        images += [(label, image) for _, image in load_images(paths)]
+    return images
+
+def classify_one(runner, image, roi):
+    """
+    Preprocesses and classifies one image the way the detection loop does (bowl crop, resize,
+    quantize, invoke, dequantize). Returns the invoke time in seconds and the scores in 0-100%.
+    """
+    input_details = runner.input_details[0]
+    height, width = int(input_details['shape'][1]), int(input_details['shape'][2])
+    top, bottom, left, right = roi.crop(image.shape) if roi else (0, min(image.shape[:2]), 0, min(image.shape[:2]))
+    pixels = cv2.resize(image[top:bottom, left:right], (width, height))[np.newaxis]
+
+    scale, zero_point = input_details['quantization']
+    if input_details['dtype'] != np.uint8:
+        pixels = pixels.astype(np.float32)
+        pixels = np.round(pixels / 255.0 / scale + zero_point) if scale else pixels / 255.0
+    runner.interpreter.set_tensor(runner.input_index, pixels.astype(input_details['dtype']))
+
+    start = time.perf_counter()
+    runner.interpreter.invoke()
+    invoke_time = time.perf_counter() - start
+
+    output = runner.interpreter.get_tensor(runner.output_index)[0].astype(np.float32)
+    scale, zero_point = runner.output_details[0]['quantization']
+    scores = (output - zero_point) * scale * 100.0 if scale else output * 100.0
+    return invoke_time, np.nan_to_num(scores, nan=0.0)
+
+def run_worker(model_path, threads, frames_folder, labeled_folder, rounds, use_roi):
+    """
+    Benchmarks one model with one thread count in this process and returns the results.
+    Runs in its own process so peak RSS belongs to this model alone.
+    """
+    from modules.interpreter_pool import PooledInterpreter, load_delegates
+    roi = None
+    if use_roi:
+        from modules.roi import bowl_roi
+        roi = bowl_roi
+
+    frames = [image for _, image in load_images(sorted(Path(frames_folder).glob("*.jpg")))]
+    labeled = labeled_images(labeled_folder) if labeled_folder and Path(labeled_folder).is_dir() else []
+    baseline_rss = peak_rss_mb()  # Python, OpenCV and the images, before the model
+
+    start = time.perf_counter()
+    runner = PooledInterpreter(model_path, threads, INTERPRETER_USE_XNNPACK, load_delegates(INTERPRETER_DELEGATES))
+    load_time = time.perf_counter() - start
+
+    first_invoke, _ = classify_one(runner, frames[0], roi)
+    invoke_times, frame_times = [], []
+    for _ in range(rounds):
+        for image in frames:
+            start = time.perf_counter()
+            invoke_time, _ = classify_one(runner, image, roi)
+            frame_times.append(time.perf_counter() - start)
+            invoke_times.append(invoke_time)
+    invoke_ms = np.array(invoke_times) * 1000
+    frame_ms = np.array(frame_times) * 1000
+
+    confusion = {label: {predicted: 0 for predicted in CLASS_LABELS} for label in CLASS_LABELS}  # true -> predicted -> count
+    for label, image in labeled:
+        _, scores = classify_one(runner, image, roi)
+        confusion[label][CLASS_LABELS[int(scores.argmax())]] += 1
+    correct = sum(confusion[label][label] for label in CLASS_LABELS)
+
+    return {
+        "model": Path(model_path).stem,
+        "path": str(model_path),
+        "threads": threads,
+        "input": f"{list(runner.input_details[0]['shape'][1:])} {np.dtype(runner.input_details[0]['dtype']).name}",
+        "load_ms": round(load_time * 1000, 1),
+        "first_invoke_ms": round(first_invoke * 1000, 2),
+        "invoke_p50_ms": round(float(np.percentile(invoke_ms, 50)), 2),
+        "invoke_p95_ms": round(float(np.percentile(invoke_ms, 95)), 2),
+        "frame_p50_ms": round(float(np.percentile(frame_ms, 50)), 2),  # Preprocessing + invoke + dequantize
+        "frame_p95_ms": round(float(np.percentile(frame_ms, 95)), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "model_rss_mb": round(peak_rss_mb() - baseline_rss, 1),
+        "latency_frames": len(invoke_times),
+        "labeled_images": len(labeled),
+        "accuracy": round(correct / len(labeled), 4) if labeled else None,
+        "recall": {label: round(confusion[label][label] / sum(confusion[label].values()), 4) if sum(confusion[label].values()) else None for label in CLASS_LABELS},
+        "confusion": confusion
+    }
+
+def shipped_models(model_dirs):
+    """
+    Returns the .tflite files in the model folders, skipping byte-for-byte copies of one already listed.
+    """
+    models, seen = [], {}
+    for folder in model_dirs:
+        for path in sorted(Path(folder).glob("*.tflite")):
+            digest = hashlib.sha1(path.read_bytes()).hexdigest()
+            if digest in seen:
+                print(f"Skipping {path}: same file as {seen[digest]}")
+                continue
+            seen[digest] = path
+            models.append(path)
+    return models
+
+def run_config(model_path, threads, args):
+    """
+    Runs one model/thread benchmark in a fresh Python process and returns its results.
+    """
+    command = [sys.executable, str(Path(__file__).resolve()), "--worker", str(model_path), "--threads", str(threads),
+               "--frames", args.frames, "--labeled", str(args.labeled), "--rounds", str(args.rounds)]
+    if args.no_roi:
+        command.append("--no-roi")
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=WORKER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return {"model": model_path.stem, "path": str(model_path), "threads": threads, "error": f"Timed out after {WORKER_TIMEOUT}s"}
+    if completed.returncode != 0:
+        error = (completed.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"model": model_path.stem, "path": str(model_path), "threads": threads, "error": error}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+CSV_COLUMNS = ["model", "threads", "input", "load_ms", "first_invoke_ms", "invoke_p50_ms", "invoke_p95_ms",
+               "frame_p50_ms", "frame_p95_ms", "peak_rss_mb", "model_rss_mb", "accuracy"] + [f"recall_{label}" for label in CLASS_LABELS] + ["path", "error"]
+
+def write_csv(results, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for result in results:
+            row = dict(result, **{f"recall_{label}": value for label, value in result.get("recall", {}).items()})
+            writer.writerow(row)
+
+def print_table(results):
+    print(f"\n{'model':<28}{'thr':>4}{'load ms':>9}{'first ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'RSS MB':>9}{'accuracy':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['model']:<28}{r['threads']:>4}  error: {r['error']}")
+            continue
+        accuracy = f"{r['accuracy'] * 100:.1f}%" if r["accuracy"] is not None else "-"
+        print(f"{r['model']:<28}{r['threads']:>4}{r['load_ms']:>9.1f}{r['first_invoke_ms']:>10.2f}{r['invoke_p50_ms']:>9.2f}{r['invoke_p95_ms']:>9.2f}{r['peak_rss_mb']:>9.1f}{accuracy:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks every shipped TFLite model at several interpreter thread counts.")
+    parser.add_argument("--models", nargs="*", help="Model files to benchmark (default: every .tflite in the model folders)")
+    parser.add_argument("--threads", default=THREADS, help="Comma-separated interpreter thread counts")
+    parser.add_argument("--frames", default=FRAMES_FOLDER, help="Folder of camera frames for latency (relative to pi/src)")
+    parser.add_argument("--labeled", default=str(LABELED_FOLDER), help="Folder with Mila/Nova/None subfolders for accuracy")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="Passes over the frames for steady-state latency")
+    parser.add_argument("--no-roi", action="store_true", help="Classify whole images instead of the bowl crop (for pre-cropped photos)")
+    parser.add_argument("--json", default="model_benchmark.json", help="Where to write the full results")
+    parser.add_argument("--csv", default="model_benchmark.csv", help="Where to write the results table")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)  # Internal: benchmark this one model in this process
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, int(args.threads), args.frames, args.labeled, args.rounds, not args.no_roi)
+        print(json.dumps(result))
+        return
+
+    models = [CALLER_DIR / path for path in args.models] if args.models else shipped_models(MODEL_DIRS)
+    thread_counts = [int(threads) for threads in args.threads.split(",")]
+    args.labeled = CALLER_DIR / args.labeled
+    if not args.labeled.is_dir():
+        print(f"No labeled folder at {args.labeled}; reporting latency only.")
+
+    results = []
+    for model_path in models:
+        for threads in thread_counts:
+            print(f"Benchmarking {model_path.name} with {threads} threads...")
+            results.append(run_config(model_path, threads, args))
+
+    print_table(results)
+    json_path, csv_path = CALLER_DIR / args.json, CALLER_DIR / args.csv
+    with open(json_path, "w") as f:
+        json.dump(results, f, indent=2)
+    write_csv(results, csv_path)
+    print(f"\nResults written to {json_path} and {csv_path}")
+
+if __name__ == "__main__":
+    main()
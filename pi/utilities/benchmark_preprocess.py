@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import cv2
+
+# Run from pi/src so config paths (model, logs, report) resolve like they do for main.py
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+os.chdir(SRC_DIR)
+sys.path.insert(0, str(SRC_DIR))
+
+from config import CLASS_LABELS
+import modules.image_processing as ip
+
+# Configuration
+TEST_FOLDER = "test-photos/test-set-2"  # Frames to benchmark with (relative to pi/src)
+ROUNDS = 5  # Passes over the folder for each path, alternating between them
+
+def copy_path(img, model, runner):
+    """
+    The original path: preprocess_image(), set_tensor(), invoke(), get_tensor() and dict rescaling.
+    Returns the time spent outside invoke() and the time spent in invoke().
+    """
+    start = time.perf_counter()
+    runner.set_batch_size(1)
+    batch = ip.preprocess_image(img, model.input_size)
+    runner.interpreter.set_tensor(runner.input_index, batch)
+    invoke_start = time.perf_counter()
+    runner.interpreter.invoke()
+    invoke_end = time.perf_counter()
+    predictions = runner.interpreter.get_tensor(runner.output_index)[0]
+    predictions = np.nan_to_num(model.dequantize(predictions), nan=0.0)
+    scores = {label: predictions[i] for i, label in enumerate(CLASS_LABELS)}
+    end = time.perf_counter()
+    return (end - start) - (invoke_end - invoke_start), invoke_end - invoke_start, scores
+
+def zero_copy_path(img, model, runner):
+    """
+    The zero-copy path through classify(), with invoke() timed separately.
+    """
+    invoke = runner.interpreter.invoke
+    invoke_time = 0.0
+
+    def timed_invoke():
+        nonlocal invoke_time
+        invoke_start = time.perf_counter()
+        invoke()
+        invoke_time = time.perf_counter() - invoke_start
+
+    runner.interpreter.invoke = timed_invoke
+    try:
+        start = time.perf_counter()
+        scores = ip.classify([img], model, runner)[0]
+        end = time.perf_counter()
+    finally:
+        runner.interpreter.invoke = invoke
+    return (end - start) - invoke_time, invoke_time, scores
+
+def run(path, images, model, runner):
+    overhead, invoke_times, results = [], [], []
+    for img in images:
+        prep, invoke_time, scores = path(img, model, runner)
+        overhead.append(prep)
+        invoke_times.append(invoke_time)
+        results.append(scores)
+    return overhead, invoke_times, results
+
+def main():
+    image_paths = sorted(Path(TEST_FOLDER).glob("*.jpg"))
+    images = [img for img in (cv2.imread(str(path)) for path in image_paths) if img is not None]
+    print(f"Benchmarking {len(images)} frames from {TEST_FOLDER}, {ROUNDS} rounds each.\n")
+
+    # Alternate the paths round by round, so drift (thermal throttling, other load) hits both alike
+    paths = {"copy": copy_path, "zero-copy": zero_copy_path}
+    overhead = {name: [] for name in paths}
+    invoke_times = {name: [] for name in paths}
+    results = {name: [] for name in paths}
+    round_speedups = []
+    model = ip.registry.active
+    with model.pool.interpreter() as runner:
+        for _ in range(ROUNDS):
+            round_means = {}
+            for name, path in paths.items():
+                prep, invoke_time, scores = run(path, images, model, runner)
+                overhead[name] += prep
+                invoke_times[name] += invoke_time
+                results[name] = scores
+                round_means[name] = np.mean(prep)
+            round_speedups.append(round_means["copy"] / round_means["zero-copy"])
+
+    # Both paths must agree on the scores
+    max_diff = max(
+        float(np.abs(np.array([old[label] for label in CLASS_LABELS]) - new).max())
+        for old, new in zip(results["copy"], results["zero-copy"])
+    )
+
+    print(f"{'Path':<12}{'pre/post mean':>16}{'pre/post p95':>16}{'invoke mean':>16}")
+    for name in paths:
+        prep, invoke = np.array(overhead[name]) * 1000, np.array(invoke_times[name]) * 1000
+        print(f"{name:<12}{prep.mean():>13.3f} ms{np.percentile(prep, 95):>13.3f} ms{invoke.mean():>13.3f} ms")
+    speedup = np.mean(overhead["copy"]) / np.mean(overhead["zero-copy"])
+    print(f"\nPre/post-processing speedup: {speedup:.2f}x (per round {min(round_speedups):.2f}x to {max(round_speedups):.2f}x)")
+    if min(round_speedups) <= 1.0 <= max(round_speedups):
+        print("The rounds disagree on which path is faster: the difference is within run-to-run noise.")
+    print(f"Largest score difference between paths: {max_diff:.4f}%")
+
+if __name__ == "__main__":
+    main()
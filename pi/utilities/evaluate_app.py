@@ -2,15 +2,13 @@ from flask import Flask, render_template, request, redirect, url_for
 import os
 import numpy as np
 import cv2
-import tflite_runtime.interpreter as tflite
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))  # For the shared interpreter pool
+from modules.interpreter_pool import InterpreterPool
 
-# Load the TensorFlow Lite model
-interpreter = tflite.Interpreter(model_path="dog_singular_model.tflite")
-interpreter.allocate_tensors()
-
-# Get input and output details
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
+# Load the TensorFlow Lite model into a pool so concurrent requests each get their own interpreter
+pool = InterpreterPool(model_path="dog_singular_model.tflite")
 
 # Class labels
 class_labels = ["Mila", "Nova", "None"]
@@ -49,14 +47,15 @@ def evaluate_image(image_path):
     input_size = (128, 128)  # Match the input size used during training
     img = preprocess_image(image_path, input_size)
 
-    # Set the input tensor
-    interpreter.set_tensor(input_details[0]['index'], img)
+    with pool.interpreter() as runner:
+        # Set the input tensor
+        runner.interpreter.set_tensor(runner.input_index, img)
 
-    # Run inference
-    interpreter.invoke()
+        # Run inference
+        runner.interpreter.invoke()
 
-    # Get the predictions and copy the data
-    predictions = interpreter.get_tensor(output_details[0]['index'])[0].copy()
+        # Get the predictions and copy the data
+        predictions = runner.interpreter.get_tensor(runner.output_index)[0].copy()
 
     # Find the predicted class and confidence
     predicted_class = np.argmax(predictions)
@@ -1,7 +1,10 @@
-import tensorflow.lite.Interpreter as tflite
 import numpy as np
 import cv2
 import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))  # For the shared interpreter pool
+from modules.interpreter_pool import InterpreterPool
 
 # Configurations
 MODEL_PATH = "../src/tm_dog_model/model3.tflite"  # Path to your TensorFlow Lite model
@@ -9,12 +12,7 @@ CLASS_LABELS = ["Mila", "Nova", "None"]  # Class names in the model
 INPUT_SIZE = (224, 224)  # Adjust to match your model's expected input size
 
 # Load the TensorFlow Lite model
-interpreter = tflite(MODEL_PATH)
-interpreter.allocate_tensors()
-
-# Get input and output tensors
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
+pool = InterpreterPool(model_path=MODEL_PATH, size=1)
 
 def preprocess_image(image_path):
     """Loads and preprocesses an image for TensorFlow Lite model inference."""
@@ -31,9 +29,10 @@ def evaluate_image(image_path):
     if image is None:
         return None, None
 
-    interpreter.set_tensor(input_details[0]['index'], image)
-    interpreter.invoke()
-    predictions = interpreter.get_tensor(output_details[0]['index'])[0]  # Extract predictions
+    with pool.interpreter() as runner:
+        runner.interpreter.set_tensor(runner.input_index, image)
+        runner.interpreter.invoke()
+        predictions = runner.interpreter.get_tensor(runner.output_index)[0]  # Extract predictions
 
     # Convert predictions to percentages and get the predicted class
     predictions = predictions / 255.0 * 100.0
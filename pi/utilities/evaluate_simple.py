@@ -2,15 +2,13 @@ import os
 import time
 import numpy as np
 import cv2
-import tflite_runtime.interpreter as tflite
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))  # For the shared interpreter pool
+from modules.interpreter_pool import InterpreterPool
 
-# Load the TensorFlow Lite model
-interpreter = tflite.Interpreter(model_path="dog_classifier_model_v1.tflite")
-interpreter.allocate_tensors()
-
-# Get input and output details
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
+# Load the TensorFlow Lite model (warmed up, so the timing below is steady-state)
+pool = InterpreterPool(model_path="dog_classifier_model_v1.tflite", size=1)
 
 # Class labels
 class_labels = ["Mila", "Nova", "None"]
@@ -41,16 +39,17 @@ def evaluate_image(image_path):
     input_size = (212, 212)  # Match the input size used during training
     img = preprocess_image(image_path, input_size)
 
-    # Set the input tensor
-    interpreter.set_tensor(input_details[0]['index'], img)
+    with pool.interpreter() as runner:
+        # Set the input tensor
+        runner.interpreter.set_tensor(runner.input_index, img)
 
-    # Measure inference time
-    start_time = time.time()
-    interpreter.invoke()
-    inference_time = time.time() - start_time
+        # Measure inference time
+        start_time = time.time()
+        runner.interpreter.invoke()
+        inference_time = time.time() - start_time
 
-    # Get the predictions
-    predictions = interpreter.get_tensor(output_details[0]['index'])[0]
+        # Get the predictions
+        predictions = runner.interpreter.get_tensor(runner.output_index)[0]
 
     # Find the predicted class and confidence
     predicted_class = np.argmax(predictions)
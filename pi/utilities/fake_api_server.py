@@ -0,0 +1,74 @@
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for cloud/api/record_visit.php, for testing the visit outbox without the real server.
+# Point the app at it with API_URL = "http://127.0.0.1:8089/record_visit.php" in config.py.
+
+class RecordVisitHandler(BaseHTTPRequestHandler):
+    visits = []  # Every visit recorded so far
+    args = None
+
+    def do_POST(self):
+        # Simulate a slow or flaky server
+        time.sleep(self.args.delay)
+        if random.random() < self.args.fail_rate:
+            return self.reply(503, {"error": "Simulated failure"})
+
+        if self.headers.get("Authorization") != f"Bearer {self.args.api_key}":
+            return self.reply(403, {"error": "Unauthorized access"})
+
+        try:
+            data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            return self.reply(400, {"error": "Invalid input data"})
+
+        # Same validation as record_visit.php: one visit, or a batch as {"visits": [...]}
+        visits = data["visits"] if isinstance(data.get("visits"), list) else [data]
+        if not all(isinstance(visit, dict) and {"dog", "start_time", "end_time"} <= visit.keys() for visit in visits):
+            return self.reply(400, {"error": "Invalid input data"})
+
+        self.visits.extend(visits)
+        for visit in visits:
+            print(f"Recorded visit: {visit['dog']} {visit['start_time']} - {visit['end_time']}")
+        print(f"({len(visits)} in this request, {len(self.visits)} total)")
+        self.reply(200, {"status": "success", "recorded": len(visits)})
+
+    def do_GET(self):
+        self.reply(200, self.visits[-10:][::-1])
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep the output to the recorded visits
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake record_visit.php for testing visit uploads locally.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--api-key", default=None, help="Expected API key (default: read ../src/api_key.txt)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering each request.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests to answer with a 503.")
+    args = parser.parse_args()
+
+    if args.api_key is None:
+        args.api_key = (Path(__file__).resolve().parent.parent / "src" / "api_key.txt").read_text().strip()
+
+    RecordVisitHandler.args = args
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), RecordVisitHandler)
+    print(f"Fake record_visit.php listening on http://127.0.0.1:{args.port}/record_visit.php")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+import cv2
+
+# Run from pi/src so config paths (model, labels) resolve like they do for main.py
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+os.chdir(SRC_DIR)
+sys.path.insert(0, str(SRC_DIR))
+
+# Keep everything the replay writes out of the real report, log and store
+import config
+WORK_DIR = Path(tempfile.mkdtemp(prefix="ninas-replay-"))
+config.STORE_PATH = str(WORK_DIR / "replay.db")
+config.REPORT_DATA_DIR = str(WORK_DIR / "report-data")
+config.LOG_FILE = str(WORK_DIR / "replay.log")
+config.API_KEY_FILE = str(WORK_DIR / "api_key.txt")  # The outbox is never started, so visits are never uploaded
+config.API_URL = "http://127.0.0.1:9/replay"
+(WORK_DIR / "api_key.txt").write_text("replay")
+
+with contextlib.redirect_stdout(sys.stderr):  # Keep stdout for the JSON report
+    import main as app
+from config import DETECTION_TIMEOUT, VISIT_TIMEOUT, SAFETY_BUFFER
+from modules.state import app_state as state
+from modules.camera import FrameBuffer
+from modules.scheduler import FrameScheduler
+from modules.clock import clock
+from modules.metrics import metrics
+from modules.store import store
+from modules.image_writer import image_writer
+from modules.inference_cache import inference_cache
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S%f"  # Frame names saved by the camera, e.g. 20241224_021639142270.jpg
+IDLE_CHECK_INTERVAL = 0.1  # How often the live decision stage checks timeouts while idle (pipeline.Stage poll_interval)
+
+def recorded_frames(folder):
+    """
+    Returns (timestamp, path) for every frame in the folder named with its capture time, oldest first,
+    and the names of files that aren't.
+    """
+    frames, skipped = [], []
+    for path in sorted(Path(folder).glob("*.jpg")):
+        try:
+            frames.append((datetime.strptime(path.stem, TIMESTAMP_FORMAT).timestamp(), path))
+        except ValueError:
+            skipped.append(path.name)
+    frames.sort()
+    return frames, skipped
+
+def timeouts_pending():
+    return state.current_visit["dog"] is not None or state.current_buzz_event is not None or state.safety_buffer_active
+
+def run_timeouts(until):
+    """
+    Advances the clock towards `until` in decision-stage idle steps, checking timeouts at each one
+    like the live decision stage does between frames. Stops once no visit, buzz or safety buffer is open.
+    """
+    now = clock.time()
+    while timeouts_pending() and now + IDLE_CHECK_INTERVAL < until:
+        now += IDLE_CHECK_INTERVAL
+        clock.set(now)
+        app.check_timeouts()
+
+def replay(frames, realtime=False, speed=1.0):
+    """
+    Feeds the frames through motion scoring, verification and the decision logic in order,
+    on a clock that follows their recorded timestamps. With `realtime` the frames are paced
+    at their recorded intervals (divided by `speed`); otherwise they go as fast as possible.
+    Returns the wall-clock seconds spent, and the seconds spent outside of pacing sleeps.
+    """
+    state.frame_buffer = FrameBuffer()
+    state.scheduler = FrameScheduler()
+    state.gpio = None  # Never drive the real bowl from a replay
+
+    first_timestamp = frames[0][0]
+    started = time.perf_counter()
+    sleeping = 0.0
+    for timestamp, path in frames:
+        if realtime:
+            delay = started + sleeping + (timestamp - first_timestamp) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+                sleeping += delay
+
+        with metrics.timer("replay_read"):
+            image = cv2.imread(str(path))
+        if image is None:
+            continue
+        if clock.fixed is not None:
+            run_timeouts(timestamp)  # Through the gap since the previous frame
+        clock.set(timestamp)
+        app.check_timeouts()  # What the decision stage does while idle
+        frame = state.frame_buffer.put(image, timestamp)
+        metrics.increment("frames_replayed")
+        if app.score_motion(frame) is None:
+            continue
+        with metrics.timer("stage.inference"):
+            result = app.evaluate_frames(frame)
+        app.decide(result)
+
+    # Let the timeouts run out so the last visit and buzz event are finalized
+    run_timeouts(frames[-1][0] + max(DETECTION_TIMEOUT, VISIT_TIMEOUT, SAFETY_BUFFER) + 1)
+    clock.release()
+    image_writer.flush()
+
+    wall = time.perf_counter() - started
+    return wall, wall - sleeping
+
+def report(folder, frames, skipped, wall, busy, realtime):
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    inferences = counters.get("inferences", 0)
+    return {
+        "folder": str(folder),
+        "mode": "realtime" if realtime else "fast",
+        "frames": len(frames),
+        "skipped_files": skipped,
+        "recorded_seconds": round(frames[-1][0] - frames[0][0], 3),
+        "wall_seconds": round(wall, 3),
+        "busy_seconds": round(busy, 3),  # Wall time minus realtime pacing
+        "throughput": {
+            "frames_per_s": round(counters.get("frames_replayed", 0) / busy, 2) if busy else None,
+            "inferences_per_s": round(inferences / busy, 2) if busy else None
+        },
+        "counters": counters,
+        "latency": snapshot["latency"],
+        "inference_cache": inference_cache.stats(),
+        "image_writer": image_writer.stats(),
+        "visits": [
+            {"dog": visit["dog"], "start_time": visit["start_time"], "end_time": visit["end_time"]}
+            for visit in reversed(store.visits(limit=100000))
+        ],
+        "buzz_events": [
+            {"start_time": event["start_time"], "end_time": event["end_time"], "frames": len(event["frames"])}
+            for event in reversed(store.buzz_events(limit=100000))
+        ],
+        "work_dir": str(WORK_DIR)  # Report images and the log written during the replay
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays recorded frames through the detection logic and reports throughput, latency and the visit/buzz timeline.")
+    parser.add_argument("folder", help="Folder of frames named YYYYMMDD_HHMMSSffffff.jpg (relative to pi/src)")
+    parser.add_argument("--realtime", action="store_true", help="Pace frames at their recorded intervals instead of as fast as possible")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier for --realtime")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    frames, skipped = recorded_frames(args.folder)
+    if not frames:
+        print(f"No timestamped frames found in {args.folder}")
+        return
+
+    wall, busy = replay(frames, args.realtime, args.speed)
+    result = report(args.folder, frames, skipped, wall, busy, args.realtime)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Replayed {len(frames)} frames in {wall:.1f}s; report written to {args.output}")
+    else:
+        print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
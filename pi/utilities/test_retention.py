@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Run from pi/src so config paths resolve like they do for main.py
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+os.chdir(SRC_DIR)
+sys.path.insert(0, str(SRC_DIR))
+
+# Keep the index and log out of the real store
+import config
+WORK_DIR = Path(tempfile.mkdtemp(prefix="ninas-retention-test-"))
+config.STORE_PATH = str(WORK_DIR / "test.db")
+config.LOG_FILE = str(WORK_DIR / "test.log")
+
+from modules.retention import RetentionManager
+from modules.store import store
+
+def db_usage():
+    return {category: list(values) for category, values in store.report_file_usage().items()}
+
+def test_rewritten_name_counted_once():
+    """
+    Writing the same file name twice (a burst within one second) must leave the in-memory
+    usage equal to the index, with the second write's size.
+    """
+    directory = WORK_DIR / "report-data"
+    retention = RetentionManager(directory=directory)
+    retention.load_index()
+
+    path = directory / "Nova-20250101120000.jpg"
+    path.write_bytes(b"x" * 1000)
+    retention.track(path)
+    path.write_bytes(b"x" * 1500)
+    retention.track(path)
+
+    assert retention.usage == db_usage() == {"detection": [1, 1500]}, (retention.usage, db_usage())
+
+    # A different name is still counted on its own
+    other = directory / "TestCase_20250101120000.jpg"
+    other.write_bytes(b"x" * 200)
+    retention.track(other)
+    assert retention.usage == db_usage() == {"detection": [1, 1500], "test_case": [1, 200]}, (retention.usage, db_usage())
+
+if __name__ == "__main__":
+    test_rewritten_name_counted_once()
+    print("Retention usage matches the index.")